@@ -0,0 +1,126 @@
+# Минимальный разбор ID3-тегов: исполнитель, название и обложка — без сторонних библиотек
+
+_TEXT_ENCODINGS = {0: "latin-1", 1: "utf-16", 2: "utf-16-be", 3: "utf-8"}
+
+# Идентификаторы кадров: ID3v2.2 использует трёхбуквенные
+_FRAMES = {
+    "TPE1": "artist", "TP1": "artist",
+    "TIT2": "title", "TT2": "title",
+    "APIC": "cover", "PIC": "cover",
+}
+
+_PIC_FORMATS = {"JPG": "image/jpeg", "PNG": "image/png"}
+
+
+def _synchsafe(data) -> int:
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _terminator(encoding: int) -> bytes:
+    return b"\x00\x00" if encoding in (1, 2) else b"\x00"
+
+
+def _split_terminated(data: bytes, encoding: int):
+    """Строка до нуль-терминатора и остаток; для UTF-16 терминатор выровнен по двум байтам"""
+    term = _terminator(encoding)
+    pos = data.find(term)
+    while len(term) == 2 and pos != -1 and pos % 2:
+        pos = data.find(term, pos + 1)
+    if pos == -1:
+        return data, b""
+    return data[:pos], data[pos + len(term):]
+
+
+def _decode_text(data: bytes) -> str:
+    if not data:
+        return ""
+    encoding = data[0]
+    # В ID3v2.4 несколько значений разделяются нулём — берём первое
+    text, _ = _split_terminated(data[1:], encoding)
+    return text.decode(_TEXT_ENCODINGS.get(encoding, "latin-1"), errors="replace").strip()
+
+
+def _decode_picture(data: bytes, version: int):
+    if len(data) < 2:
+        return None
+    encoding = data[0]
+    if version == 2:
+        mime = _PIC_FORMATS.get(data[1:4].decode("latin-1").upper(), "image/jpeg")
+        rest = data[5:]
+    else:
+        mime_bytes, rest = _split_terminated(data[1:], 0)
+        mime = mime_bytes.decode("latin-1").lower() or "image/jpeg"
+        rest = rest[1:]  # тип картинки
+    _, picture = _split_terminated(rest, encoding)
+    if not picture:
+        return None
+    if "/" not in mime:
+        mime = f"image/{mime}"
+    return mime.replace("image/jpg", "image/jpeg"), picture
+
+
+def _read_id3v2(data: bytes) -> dict:
+    if len(data) < 10 or data[:3] != b"ID3":
+        return {}
+
+    version, flags = data[3], data[5]
+    if version not in (2, 3, 4):
+        return {}
+    end = min(10 + _synchsafe(data[6:10]), len(data))
+    body = data[10:end]
+    if flags & 0x80 and version < 4:
+        # Unsynchronisation в 2.2/2.3 применяется ко всему тегу
+        body = body.replace(b"\xff\x00", b"\xff")
+
+    pos = 0
+    if flags & 0x40 and version >= 3 and len(body) >= 4:
+        ext_size = _synchsafe(body[:4]) if version == 4 else int.from_bytes(body[:4], "big") + 4
+        pos = ext_size
+
+    id_size, header_size = (3, 6) if version == 2 else (4, 10)
+    tags = {}
+    while pos + header_size <= len(body):
+        frame_id = body[pos:pos + id_size]
+        if not frame_id.strip(b"\x00"):
+            break  # паддинг
+        if version == 2:
+            size = int.from_bytes(body[pos + 3:pos + 6], "big")
+        elif version == 3:
+            size = int.from_bytes(body[pos + 4:pos + 8], "big")
+        else:
+            size = _synchsafe(body[pos + 4:pos + 8])
+        frame_flags = body[pos + 9] if version == 4 else 0
+        frame = body[pos + header_size:pos + header_size + size]
+        pos += header_size + size
+
+        name = _FRAMES.get(frame_id.decode("latin-1", errors="replace"))
+        if not name or name in tags:
+            continue
+        if frame_flags & 0x02:
+            frame = frame.replace(b"\xff\x00", b"\xff")
+        if frame_flags & 0x01 and len(frame) >= 4:
+            frame = frame[4:]  # длина данных до unsynchronisation
+
+        value = _decode_picture(frame, version) if name == "cover" else _decode_text(frame)
+        if value:
+            tags[name] = value
+    return tags
+
+
+def _read_id3v1(data: bytes) -> dict:
+    if len(data) < 128 or data[-128:-125] != b"TAG":
+        return {}
+    tag = data[-128:]
+    tags = {}
+    for name, start in (("title", 3), ("artist", 33)):
+        value = tag[start:start + 30].split(b"\x00", 1)[0].decode("latin-1").strip()
+        if value:
+            tags[name] = value
+    return tags
+
+
+def read_tags(data: bytes) -> dict:
+    """{'artist': str, 'title': str, 'cover': (mime, bytes)} — только найденные поля"""
+    tags = _read_id3v1(data)
+    tags.update(_read_id3v2(data))
+    return tags
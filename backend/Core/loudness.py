@@ -0,0 +1,124 @@
+# Громкость по EBU R128 / ITU-R BS.1770 и пиковая волна — векторно на NumPy, поток PCM кусками
+import numpy as np
+
+SAMPLE_RATE = 48000
+SUB_BLOCK = SAMPLE_RATE // 10  # 100 мс: шаг 400-мс блоков с перекрытием 75%
+
+# K-фильтр BS.1770 для 48 кГц: полка + ФВЧ, коэффициенты (b, a)
+_K_WEIGHTING = (
+    ([1.53512485958697, -2.69169618940638, 1.19839281085285], [1.0, -1.69065929318241, 0.73248077421585]),
+    ([1.0, -2.0, 1.0], [1.0, -1.99004745483398, 0.99007225036621]),
+)
+
+# Свёртка overlap-save: отклик K-фильтра затухает за ~3000 отсчётов, запас с избытком
+_FFT_SIZE = 1 << 17
+_OVERLAP = 1 << 14
+
+_ABSOLUTE_GATE = -70.0
+_RELATIVE_GATE = -10.0
+
+
+def _k_weighting_response(size: int) -> np.ndarray:
+    """Комплексная АЧХ каскада биквадов на частотах rfft размера size"""
+    z = np.exp(-1j * 2 * np.pi * np.arange(size // 2 + 1) / size)
+    response = np.ones_like(z)
+    for b, a in _K_WEIGHTING:
+        response *= np.polyval(b[::-1], z) / np.polyval(a[::-1], z)
+    return response
+
+
+class _BlockReducer:
+    """Сворачивает поток значений в блоки фиксированной длины, хвост переносит в следующий вызов"""
+
+    def __init__(self, size: int, reduce):
+        self.size = size
+        self.reduce = reduce
+        self.values = []
+        self._rest = np.empty(0, dtype=np.float64)
+
+    def feed(self, data: np.ndarray):
+        data = np.concatenate((self._rest, data))
+        whole = len(data) - len(data) % self.size
+        if whole:
+            self.values.append(self.reduce(data[:whole].reshape(-1, self.size), axis=1))
+        self._rest = data[whole:]
+
+    def finish(self, partial: bool = False) -> np.ndarray:
+        values = list(self.values)
+        # Неполный последний блок учитываем только для пиков, в громкость он не идёт
+        if partial and len(self._rest):
+            values.append(self.reduce(self._rest[None, :], axis=1))
+        return np.concatenate(values) if values else np.empty(0)
+
+
+class LoudnessMeter:
+    """Интегральная громкость (LUFS), сэмпл-пик и пики по 100 мс для волны"""
+
+    def __init__(self, channels: int = 2):
+        self.channels = channels
+        self.samples = 0
+        self.peak = 0.0
+        self._response = _k_weighting_response(_FFT_SIZE)
+        self._history = np.zeros((_OVERLAP, channels))
+        self._pending = np.empty((0, channels))
+        self._energy = _BlockReducer(SUB_BLOCK, np.mean)
+        self._peaks = _BlockReducer(SUB_BLOCK, np.max)
+
+    @property
+    def duration(self) -> float:
+        return self.samples / SAMPLE_RATE
+
+    def feed(self, pcm: np.ndarray):
+        """pcm — float32, форма (кадры, каналы)"""
+        if not len(pcm):
+            return
+        self.samples += len(pcm)
+        magnitude = np.abs(pcm).max(axis=1)
+        self.peak = max(self.peak, float(magnitude.max()))
+        self._peaks.feed(magnitude)
+
+        self._pending = np.concatenate((self._pending, pcm))
+        step = _FFT_SIZE - _OVERLAP
+        while len(self._pending) >= step:
+            self._filter(self._pending[:step])
+            self._pending = self._pending[step:]
+
+    def _filter(self, block: np.ndarray):
+        segment = np.concatenate((self._history, block))
+        spectrum = np.fft.rfft(segment, n=_FFT_SIZE, axis=0)
+        filtered = np.fft.irfft(spectrum * self._response[:, None], n=_FFT_SIZE, axis=0)
+        valid = filtered[_OVERLAP:_OVERLAP + len(block)]
+        # Каналы L/R складываются с весом 1 (BS.1770)
+        self._energy.feed((valid ** 2).sum(axis=1))
+        self._history = segment[-_OVERLAP:]
+
+    def finish(self):
+        if len(self._pending):
+            self._filter(self._pending)
+            self._pending = self._pending[:0]
+
+    def integrated_loudness(self):
+        """LUFS с абсолютным (-70) и относительным (-10 LU) гейтами; None для тишины"""
+        energy = self._energy.finish()
+        if len(energy) < 4:
+            return None
+        blocks = np.convolve(energy, np.ones(4) / 4, mode="valid")
+        with np.errstate(divide="ignore"):
+            loudness = -0.691 + 10 * np.log10(blocks)
+
+        gated = blocks[loudness > _ABSOLUTE_GATE]
+        if not len(gated):
+            return None
+        relative = -0.691 + 10 * np.log10(gated.mean()) + _RELATIVE_GATE
+        gated = blocks[(loudness > _ABSOLUTE_GATE) & (loudness > relative)]
+        return float(-0.691 + 10 * np.log10(gated.mean()))
+
+    def waveform(self, points: int) -> bytes:
+        """Пики, сжатые до points значений 0..255 — массив на пару сотен байт для фронтенда"""
+        peaks = self._peaks.finish(partial=True)
+        if not len(peaks):
+            return b""
+        if len(peaks) > points:
+            edges = np.linspace(0, len(peaks), points + 1).astype(int)
+            peaks = np.maximum.reduceat(peaks, edges[:-1])
+        return (np.clip(peaks, 0, 1) * 255).round().astype(np.uint8).tobytes()
@@ -0,0 +1,147 @@
+import os
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+
+# Запросы медленнее порога печатаются целиком — вместо echo=True на каждый запрос
+DB_SLOW_QUERY_SECONDS = float(os.getenv("DB_SLOW_QUERY_SECONDS", 0.5))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency up to the last byte of the response",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ["engine", "operation"], buckets=LATENCY_BUCKETS
+)
+REDIS_LATENCY = Histogram(
+    "redis_command_duration_seconds", "Redis command round trip; pipelines count as PIPELINE",
+    ["command"], buckets=LATENCY_BUCKETS
+)
+MINIO_LATENCY = Histogram(
+    "minio_operation_duration_seconds", "MinIO call time including the wait for a free I/O worker",
+    ["operation"], buckets=LATENCY_BUCKETS
+)
+MINIO_ERRORS = Counter("minio_operation_errors", "MinIO calls that raised", ["operation"])
+SSE_CONNECTIONS = Gauge("sse_connections", "Open /track-updates streams")
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: гистограмма задержки по шаблону маршрута. SSE-потоки не меряются —
+    их длительность — это время прослушивания, для них есть sse_connections"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        streaming = False
+
+        async def send_with_status(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if not streaming:
+                # Шаблон маршрута, а не путь: /tracks/{track_id} — одна серия на все id
+                route = scope.get("route")
+                route_path = getattr(route, "path", None) or "unmatched"
+                HTTP_LATENCY.labels(scope["method"], route_path, str(status)).observe(time.perf_counter() - started)
+
+
+def _operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def instrument_engine(engine, name: str):
+    """Время каждого SQL-выражения через события SQLAlchemy"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        DB_QUERY_LATENCY.labels(name, _operation(statement)).observe(elapsed)
+        if DB_SLOW_QUERY_SECONDS and elapsed >= DB_SLOW_QUERY_SECONDS:
+            print(f"Slow query on {name} ({elapsed:.3f} s): {' '.join(statement.split())[:500]}")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        # Упавшее выражение не дошло до after_cursor_execute — убираем его отметку
+        started = context.connection.info.get("query_started") if context.connection else None
+        if started:
+            started.pop()
+
+
+def instrument_redis(client):
+    """Обёртка над командами клиента Redis; pub/sub ходит своим соединением и сюда не попадает"""
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    async def timed_execute_command(*args, **options):
+        started = time.perf_counter()
+        try:
+            return await execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.labels(str(args[0]).upper()).observe(time.perf_counter() - started)
+
+    def timed_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def timed_execute(*execute_args, **execute_kwargs):
+            started = time.perf_counter()
+            try:
+                return await execute(*execute_args, **execute_kwargs)
+            finally:
+                REDIS_LATENCY.labels("PIPELINE").observe(time.perf_counter() - started)
+
+        pipe.execute = timed_execute
+        return pipe
+
+    client.execute_command = timed_execute_command
+    client.pipeline = timed_pipeline
+    return client
+
+
+class PoolCollector:
+    """Состояние пулов соединений базы (то же, что /db/pool) в момент опроса /metrics"""
+
+    def __init__(self, pool_stats: dict):
+        self.pool_stats = pool_stats
+
+    def collect(self):
+        gauges = {
+            name: GaugeMetricFamily(f"db_pool_{name}", f"Connection pool {name.replace('_', ' ')}", labels=["engine"])
+            for name in ("size", "checked_in", "checked_out", "overflow")
+        }
+        counters = {
+            name: CounterMetricFamily(f"db_pool_{name}", f"Connection pool {name}", labels=["engine"])
+            for name in ("connects", "checkouts", "invalidated")
+        }
+        for engine_name, stats in self.pool_stats.items():
+            snapshot = stats.snapshot()
+            for name, family in {**gauges, **counters}.items():
+                family.add_metric([engine_name], snapshot[name])
+        yield from gauges.values()
+        yield from counters.values()
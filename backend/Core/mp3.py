@@ -0,0 +1,111 @@
+# Разбор заголовков MP3-кадров на лету: длительность и битрейт без декодирования и без буфера под весь файл
+
+# Битрейты, кбит/с: [версия MPEG-1 / MPEG-2 и 2.5][слой][индекс]
+_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],  # MPEG-2.5
+}
+
+
+def parse_frame_header(data, pos=0):
+    """(длина кадра, сэмплов в кадре, частота, битрейт) или None, если здесь нет заголовка"""
+    if data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+
+    version_bits = (data[pos + 1] >> 3) & 0x03
+    layer_bits = (data[pos + 1] >> 1) & 0x03
+    bitrate_index = data[pos + 2] >> 4
+    sample_rate_index = (data[pos + 2] >> 2) & 0x03
+    padding = (data[pos + 2] >> 1) & 0x01
+
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    version = 1 if version_bits == 3 else 2
+    layer = 4 - layer_bits
+    bitrate = _BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_index]
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate, bitrate
+    if layer == 3 and version == 2:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate, bitrate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate, bitrate
+
+
+def id3v2_size(header):
+    """Полный размер тега ID3v2 по первым 10 байтам файла, 0 если тега нет"""
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+    footer = 10 if header[5] & 0x10 else 0
+    return size + 10 + footer
+
+
+class Mp3Scanner:
+    """Считает длительность MP3 по заголовкам кадров, получая файл кусками"""
+
+    def __init__(self):
+        self.frames = 0
+        self.samples = 0
+        self.sample_rate = 0
+        self.audio_bytes = 0
+        self._buffer = bytearray()
+        self._skip = 0
+        self._started = False
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.sample_rate if self.sample_rate else 0.0
+
+    @property
+    def bitrate(self) -> int:
+        # Средний битрейт — для VBR честнее битрейта первого кадра
+        return int(self.audio_bytes * 8 / self.duration) if self.duration else 0
+
+    def feed(self, data: bytes):
+        if self._skip:
+            skipped = min(self._skip, len(data))
+            self._skip -= skipped
+            data = data[skipped:]
+            if not data:
+                return
+
+        buf = self._buffer
+        buf += data
+        pos = 0
+
+        if not self._started:
+            if len(buf) < 10:
+                return
+            self._started = True
+            pos = id3v2_size(buf)
+
+        while pos + 4 <= len(buf):
+            header = parse_frame_header(buf, pos)
+            if not header:
+                pos += 1
+                continue
+
+            length, samples, sample_rate, _ = header
+            self.frames += 1
+            self.samples += samples
+            self.sample_rate = sample_rate
+            self.audio_bytes += length
+            pos += length
+
+        if pos > len(buf):
+            # Хвост кадра ещё не пришёл — пропустим его без буферизации
+            self._skip = pos - len(buf)
+            pos = len(buf)
+        del buf[:pos]
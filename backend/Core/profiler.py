@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", 300))
+
+
+def _fold(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class SamplingProfiler:
+    """Сэмплирующий профайлер одного потока (event loop): раз в interval снимает его стек.
+
+    Результат — свёрнутые стеки ("a;b;c 42"), их понимают flamegraph.pl и speedscope.
+    Сам себя выключает через PROFILER_MAX_SECONDS, чтобы не остаться включённым навсегда.
+    """
+
+    def __init__(self):
+        self.samples: Counter = Counter()
+        self.interval = 0.0
+        self.started_at: Optional[float] = None
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float, thread_id: Optional[int] = None):
+        if self.running:
+            raise RuntimeError("Profiler is already running")
+        self.samples = Counter()
+        self.interval = interval
+        self.started_at = time.time()
+        self._thread_id = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        return self.folded()
+
+    def _run(self):
+        deadline = time.monotonic() + PROFILER_MAX_SECONDS
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.samples[_fold(frame)] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "started_at": self.started_at,
+            "samples": sum(self.samples.values()),
+        }
+
+
+profiler = SamplingProfiler()
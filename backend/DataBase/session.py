@@ -1,17 +1,100 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-from Core.config import URL
+from Core.config import (
+    URL, REPLICA_URL, DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_CACHE_SIZE
+)
+from Core.metrics import instrument_engine
 
 DATABASE_URL = URL
 
 Base = declarative_base()
 
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+
+def create_engine(url: str):
+    return create_async_engine(
+        url,
+        echo=DB_ECHO,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={
+            # Кэш asyncpg и кэш диалекта SQLAlchemy над ним настраиваются одним значением
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+
+class PoolStats:
+    """Счётчики пула соединений для /db/pool"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidated = 0
+        pool = engine.sync_engine.pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, *args):
+        self.connects += 1
+
+    def _on_checkout(self, *args):
+        self.checkouts += 1
+
+    def _on_invalidate(self, *args):
+        self.invalidated += 1
+
+    def snapshot(self) -> dict:
+        pool = self.engine.sync_engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "invalidated": self.invalidated,
+        }
+
+
+engine = create_engine(DATABASE_URL)
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Без реплики чтение идёт через основной пул
+replica_engine = create_engine(REPLICA_URL) if REPLICA_URL else None
+async_read_session = (
+    sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine else async_session
+)
+
+pool_stats = {"primary": PoolStats(engine)}
+instrument_engine(engine, "primary")
+if replica_engine:
+    pool_stats["replica"] = PoolStats(replica_engine)
+    instrument_engine(replica_engine, "replica")
+
 
 async def get_session() -> AsyncSession:
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_read_session() -> AsyncSession:
+    """Сессия для GET-эндпоинтов: на реплике, если она настроена"""
+    async with async_read_session() as session:
+        yield session
+
+
+async def dispose_engines():
+    await engine.dispose()
+    if replica_engine:
+        await replica_engine.dispose()
@@ -1,12 +1,29 @@
-from sqlalchemy import Column, String
+from sqlalchemy import JSON, BigInteger, Column, Float, Index, Integer, LargeBinary, String
 
 from DataBase.session import Base
 
 
 class TrackInfo(Base):
     __tablename__ = "track_info"
+    __table_args__ = (
+        # Триграммные индексы под ILIKE-поиск в GET /tracks/ (нужно расширение pg_trgm)
+        Index("ix_track_info_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_track_info_artist_trgm", "artist", postgresql_using="gin", postgresql_ops={"artist": "gin_trgm_ops"}),
+        # Порядок и курсор страниц: (title, id) — названия могут повторяться
+        Index("ix_track_info_title_id", "title", "id"),
+    )
 
+    id = Column(Integer, primary_key=True, autoincrement=True)
     artist = Column(String, nullable=False)
-    title = Column(String, primary_key=True)
+    title = Column(String, nullable=False)
     cover_url = Column(String, nullable=False)
-    mp3_url = Column(String, nullable=False)
\ No newline at end of file
+    mp3_url = Column(String, nullable=False, unique=True, index=True)  # Ключ объекта в бакете media
+    duration = Column(Float, nullable=True)  # Секунды, по заголовкам MP3-кадров
+    bitrate = Column(Integer, nullable=True)
+    size = Column(BigInteger, nullable=True)
+    # Результаты ingest_worker.py; NULL — трек ещё не проанализирован
+    loudness = Column(Float, nullable=True)  # LUFS
+    peak = Column(Float, nullable=True)
+    gain = Column(Float, nullable=True)  # дБ до LOUDNESS_TARGET
+    waveform = Column(LargeBinary, nullable=True)  # Пики 0..255
+    covers = Column(JSON, nullable=True)  # {размер: {формат: ключ в бакете image}}
@@ -0,0 +1,46 @@
+import os
+
+from redis.asyncio import Redis
+
+CATALOG_STREAM = os.getenv("CATALOG_STREAM", "catalog_events")
+CATALOG_STREAM_MAXLEN = int(os.getenv("CATALOG_STREAM_MAXLEN", 10000))
+
+
+class CatalogEventRepository:
+    """События каталога в Redis-стриме — плеер по ним обновляет плейлист без листинга бакета"""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def _publish(self, fields: dict):
+        try:
+            await self.redis.xadd(CATALOG_STREAM, fields, maxlen=CATALOG_STREAM_MAXLEN, approximate=True)
+        except Exception as e:
+            # Плеер всё равно подхватит изменения при периодическом пересканировании
+            print(f"Catalog event error: {e}")
+
+    @staticmethod
+    def _added(bucket: str, key: str, etag: str = None, size: int = None) -> dict:
+        fields = {"event": "put", "bucket": bucket, "key": key}
+        if etag:
+            fields["etag"] = etag
+        if size:
+            fields["size"] = size
+        return fields
+
+    async def track_added(self, bucket: str, key: str, etag: str = None, size: int = None):
+        await self._publish(self._added(bucket, key, etag, size))
+
+    async def tracks_added(self, bucket: str, objects: list[tuple]):
+        """Пачка событий (key, etag, size) одним пайплайном — для массового импорта"""
+        pipe = self.redis.pipeline(transaction=False)
+        for key, etag, size in objects:
+            pipe.xadd(CATALOG_STREAM, self._added(bucket, key, etag, size),
+                      maxlen=CATALOG_STREAM_MAXLEN, approximate=True)
+        try:
+            await pipe.execute()
+        except Exception as e:
+            print(f"Catalog event error: {e}")
+
+    async def track_removed(self, bucket: str, key: str):
+        await self._publish({"event": "delete", "bucket": bucket, "key": key})
@@ -0,0 +1,48 @@
+import json
+import os
+from typing import Optional
+
+from redis.asyncio import Redis
+
+INGEST_QUEUE = os.getenv("INGEST_QUEUE", "ingest_queue")
+INGEST_PROCESSING = f"{INGEST_QUEUE}:processing"
+
+
+class IngestQueueRepository:
+    """Очередь анализа аудио в Redis: API кладёт задания, ingest_worker.py их разбирает"""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    @staticmethod
+    def _job(track_id: int, mp3_url: str) -> str:
+        return json.dumps({"track_id": track_id, "mp3_url": mp3_url})
+
+    async def enqueue(self, track_id: int, mp3_url: str):
+        try:
+            await self.redis.lpush(INGEST_QUEUE, self._job(track_id, mp3_url))
+        except Exception as e:
+            # Трек уже доступен; анализ догонит запуск воркера с --backfill
+            print(f"Ingest enqueue error: {e}")
+
+    async def enqueue_many(self, tracks: list[tuple]):
+        if not tracks:
+            return
+        try:
+            await self.redis.lpush(INGEST_QUEUE, *(self._job(track_id, mp3_url) for track_id, mp3_url in tracks))
+        except Exception as e:
+            print(f"Ingest enqueue error: {e}")
+
+    async def take(self, timeout: float) -> Optional[str]:
+        # Задание переезжает в processing и удаляется только после обработки — падение воркера его не теряет
+        return await self.redis.blmove(INGEST_QUEUE, INGEST_PROCESSING, timeout, "RIGHT", "LEFT")
+
+    async def done(self, raw_job: str):
+        await self.redis.lrem(INGEST_PROCESSING, 1, raw_job)
+
+    async def requeue_unfinished(self) -> int:
+        """Возвращает в очередь задания, брошенные упавшим воркером"""
+        moved = 0
+        while await self.redis.lmove(INGEST_PROCESSING, INGEST_QUEUE, "RIGHT", "RIGHT"):
+            moved += 1
+        return moved
@@ -1,16 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+from fastapi import HTTPException, Request
 from minio import Minio
+from minio.commonconfig import CopySource
 from minio.error import S3Error
+import asyncio
+import io
 import os
+import time
+import urllib3
+
+from Core.metrics import MINIO_ERRORS, MINIO_LATENCY
+
+MINIO_IO_WORKERS = int(os.getenv("MINIO_IO_WORKERS", 16))
+MINIO_PART_SIZE = int(os.getenv("MINIO_PART_SIZE", 10 * 1024 * 1024))
+MINIO_PARALLEL_UPLOADS = int(os.getenv("MINIO_PARALLEL_UPLOADS", 4))
+MINIO_POOL_SIZE = int(os.getenv("MINIO_POOL_SIZE", 32))
+
+# Клиент minio синхронный — выносим его вызовы из event loop в отдельный пул потоков
+_executor = ThreadPoolExecutor(max_workers=MINIO_IO_WORKERS, thread_name_prefix="minio")
+
+
+async def run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    operation = getattr(func, "__name__", "call")
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+    except Exception:
+        MINIO_ERRORS.labels(operation).inc()
+        raise
+    finally:
+        MINIO_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+
+def create_minio_client() -> Minio:
+    """Один клиент на процесс: keep-alive пул соединений на все потоки загрузки"""
+    http_client = urllib3.PoolManager(
+        maxsize=MINIO_POOL_SIZE,
+        block=True,
+        timeout=urllib3.Timeout(connect=5, read=300),
+        retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+    )
+    return Minio(
+        os.getenv("MINIO_ENDPOINT", "localhost:9000"),
+        access_key=os.getenv("MINIO_ACCESS_KEY"),
+        secret_key=os.getenv("MINIO_SECRET_KEY"),
+        secure=False,
+        http_client=http_client
+    )
+
+
+async def get_minio_repository(request: Request) -> "MinioRepository":
+    minio_repo = request.app.state.minio_repo
+    try:
+        await minio_repo.ensure_ready()
+    except Exception as e:
+        print(f"MinIO initialization error: {e}")
+        raise HTTPException(status_code=503, detail="Object storage is unavailable")
+    return minio_repo
+
 
 class MinioRepository:
-    def __init__(self):
-        self.client = Minio(
-            os.getenv("MINIO_ENDPOINT", "localhost:9000"),
-            access_key=os.getenv("MINIO_ACCESS_KEY"),
-            secret_key=os.getenv("MINIO_SECRET_KEY"),
-            secure=False
-        )
-        self.ensure_buckets_exist()
+    def __init__(self, client: Optional[Minio] = None):
+        # Бакеты и политику проверяет init_minio при старте приложения, а не каждый запрос
+        self.client = client or create_minio_client()
+        self.ready = False
+        self._init_lock = asyncio.Lock()
 
     def ensure_buckets_exist(self):
         try:
@@ -23,6 +80,18 @@ class MinioRepository:
             print(f"Error creating buckets: {e}")
             raise
 
+    async def init(self):
+        await run_blocking(self.ensure_buckets_exist)
+        self.ready = True
+
+    async def ensure_ready(self):
+        """Если MinIO не было при старте, бакеты создаются при первом запросе, которому он нужен"""
+        if self.ready:
+            return
+        async with self._init_lock:
+            if not self.ready:
+                await self.init()
+
     def get_public_policy(self):
         return """{
             "Version": "2012-10-17",
@@ -36,32 +105,50 @@ class MinioRepository:
             ]
         }"""
 
-    async def upload_mp3(self, file, filename):
+    async def upload_stream(self, bucket_name, filename, reader):
+        """Заливает файл по мере чтения reader — размер заранее неизвестен, идёт multipart-загрузкой"""
         try:
-            self.client.put_object(
-                "media",  # Бакет media
-                filename,  # Имя файла без префикса
-                file,
+            return await run_blocking(
+                self.client.put_object,
+                bucket_name,
+                filename,
+                reader,
                 length=-1,
-                part_size=10 * 1024 * 1024
+                part_size=MINIO_PART_SIZE,
+                num_parallel_uploads=MINIO_PARALLEL_UPLOADS
             )
-            return filename  # Возвращаем только имя файла
         except S3Error as e:
-            print(f"Error uploading MP3: {e}")
+            print(f"Error uploading {bucket_name}/{filename}: {e}")
             raise
 
-    async def upload_image(self, file, filename):
+    async def upload_bytes(
+            self, bucket_name, filename, data: bytes, content_type="application/octet-stream", metadata=None
+    ):
+        """Файл целиком в памяти: размер известен, MinIO обходится одним PUT без multipart"""
         try:
-            self.client.put_object(
-                "image",  # Бакет image
-                filename,  # Имя файла без префикса
-                file,
-                length=-1,
-                part_size=10 * 1024 * 1024
+            return await run_blocking(
+                self.client.put_object,
+                bucket_name,
+                filename,
+                io.BytesIO(data),
+                length=len(data),
+                content_type=content_type,
+                metadata=metadata
+            )
+        except S3Error as e:
+            print(f"Error uploading {bucket_name}/{filename}: {e}")
+            raise
+
+    async def move_object(self, bucket_name, source_name, object_name):
+        """Копирование на стороне MinIO и удаление источника; вернёт результат копии (с её ETag)"""
+        try:
+            result = await run_blocking(
+                self.client.copy_object, bucket_name, object_name, CopySource(bucket_name, source_name)
             )
-            return filename  # Возвращаем только имя файла
+            await run_blocking(self.client.remove_object, bucket_name, source_name)
+            return result
         except S3Error as e:
-            print(f"Error uploading image: {e}")
+            print(f"Error moving {bucket_name}/{source_name} to {object_name}: {e}")
             raise
 
     async def delete_file(self, file_path: str):
@@ -71,7 +158,7 @@ class MinioRepository:
                 file_path = file_path[1:]
 
             bucket_name, object_name = file_path.split("/", 1)
-            self.client.remove_object(bucket_name, object_name)
+            await run_blocking(self.client.remove_object, bucket_name, object_name)
         except S3Error as e:
             print(f"Error deleting file {file_path}: {e}")
             raise
\ No newline at end of file
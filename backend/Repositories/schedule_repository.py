@@ -0,0 +1,15 @@
+import os
+
+from redis.asyncio import Redis
+
+SCHEDULE_QUEUE_KEY = os.getenv("SCHEDULE_QUEUE_KEY", "schedule:queue")
+
+
+class ScheduleRepository:
+    """Очередь ближайших треков, которую ведёт планировщик плеера (gstreamer/scheduler.py); только чтение"""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def upcoming(self, limit: int) -> list[str]:
+        return await self.redis.lrange(SCHEDULE_QUEUE_KEY, 0, limit - 1)
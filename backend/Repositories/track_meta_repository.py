@@ -0,0 +1,58 @@
+import json
+
+from redis.asyncio import Redis
+
+from Models.track_info import TrackInfo
+
+TRACK_META_PREFIX = "track_meta:"
+
+
+class TrackMetaRepository:
+    """Метаданные треков в Redis по ключу mp3 — плеер читает их без похода в базу"""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    @staticmethod
+    def _key(mp3_url: str) -> str:
+        return f"{TRACK_META_PREFIX}{mp3_url}"
+
+    @staticmethod
+    def _mapping(track: TrackInfo) -> dict:
+        return {
+            "artist": track.artist,
+            "title": track.title,
+            "cover_url": track.cover_url or "",
+        }
+
+    async def save(self, track: TrackInfo, **extra):
+        mapping = self._mapping(track)
+        # Дополнительные поля (duration, bitrate) пишем, только если они известны
+        mapping.update({key: value for key, value in extra.items() if value is not None})
+        await self.redis.hset(self._key(track.mp3_url), mapping=mapping)
+
+    async def update(self, mp3_url: str, **fields):
+        mapping = {key: value for key, value in fields.items() if value is not None}
+        if mapping:
+            await self.redis.hset(self._key(mp3_url), mapping=mapping)
+
+    async def get_many(self, mp3_urls: list[str]) -> list[dict]:
+        pipe = self.redis.pipeline(transaction=False)
+        for mp3_url in mp3_urls:
+            pipe.hgetall(self._key(mp3_url))
+        return await pipe.execute()
+
+    async def delete(self, mp3_url: str):
+        await self.redis.delete(self._key(mp3_url))
+
+    async def sync(self, tracks: list[TrackInfo], extra_fields: tuple = ()):
+        pipe = self.redis.pipeline(transaction=False)
+        for track in tracks:
+            mapping = self._mapping(track)
+            for name in extra_fields:
+                value = getattr(track, name, None)
+                if value is not None:
+                    # covers — словарь, в хэше лежит JSON, как его пишет ingest
+                    mapping[name] = json.dumps(value) if isinstance(value, (dict, list)) else value
+            pipe.hset(self._key(track.mp3_url), mapping=mapping)
+        await pipe.execute()
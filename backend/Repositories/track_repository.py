@@ -1,8 +1,25 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import delete
+from sqlalchemy import and_, delete, or_, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from typing import Optional
 from Models.track_info import TrackInfo
 
+# Лёгкая проекция вместо ORM-объектов для списков
+TRACK_COLUMNS = (
+    TrackInfo.id, TrackInfo.artist, TrackInfo.title, TrackInfo.cover_url, TrackInfo.mp3_url, TrackInfo.duration,
+    TrackInfo.covers
+)
+# При повторном импорте файл или обложка могли смениться — результаты анализа сбрасываем
+ANALYSIS_COLUMNS = ("loudness", "peak", "gain", "waveform", "covers")
+EXPORT_BATCH_SIZE = 1000
+UPSERT_BATCH_SIZE = 1000  # ImportedTrack.row() — 7 параметров на строку: 7000 на запрос при лимите asyncpg в 32767
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
 
 class TrackRepository:
     def __init__(self, session: AsyncSession):
@@ -11,20 +28,98 @@ class TrackRepository:
     async def create_track(self, track_data):
         track = TrackInfo(**track_data)
         self.session.add(track)
-        await self.session.commit()
+        try:
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise
         await self.session.refresh(track)
         return track
 
+    async def upsert_tracks(self, rows: list[dict]) -> list[tuple]:
+        """Пакетная вставка INSERT ... ON CONFLICT (mp3_url) DO UPDATE в одной транзакции; вернёт (id, mp3_url)"""
+        saved = []
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = insert(TrackInfo).values(rows[start:start + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[TrackInfo.mp3_url],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in ("artist", "title", "cover_url", "duration", "bitrate", "size", *ANALYSIS_COLUMNS)
+                }
+            ).returning(TrackInfo.id, TrackInfo.mp3_url)
+            result = await self.session.execute(stmt)
+            saved.extend(tuple(row) for row in result.all())
+        await self.session.commit()
+        return saved
+
+    async def update_analysis(self, track_id: int, **fields):
+        await self.session.execute(
+            update(TrackInfo).where(TrackInfo.id == track_id).values(**fields))
+        await self.session.commit()
+
+    async def get_unanalyzed_tracks(self) -> list[tuple]:
+        result = await self.session.execute(
+            select(TrackInfo.id, TrackInfo.mp3_url).where(or_(
+                TrackInfo.peak.is_(None),
+                and_(
+                    TrackInfo.covers.is_(None),
+                    TrackInfo.cover_url != "",
+                    TrackInfo.cover_url.not_like("http%")
+                )
+            )))
+        return [tuple(row) for row in result.all()]
+
     async def get_track_by_title(self, title: str):
         result = await self.session.execute(
             select(TrackInfo).where(TrackInfo.title == title))
         return result.scalars().first()
 
-    async def delete_track(self, title: str):
+    async def get_track_by_id(self, track_id: int):
+        return await self.session.get(TrackInfo, track_id)
+
+    async def get_track_by_mp3_url(self, mp3_url: str):
+        # Плеер знает трек по ключу объекта — точечный поиск по уникальному индексу
+        result = await self.session.execute(
+            select(TrackInfo).where(TrackInfo.mp3_url == mp3_url))
+        return result.scalars().first()
+
+    async def cover_in_use(self, cover_url: str) -> bool:
+        result = await self.session.execute(
+            select(TrackInfo.id).where(TrackInfo.cover_url == cover_url).limit(1))
+        return result.first() is not None
+
+    async def delete_track(self, track_id: int):
         await self.session.execute(
-            delete(TrackInfo).where(TrackInfo.title == title))
+            delete(TrackInfo).where(TrackInfo.id == track_id))
         await self.session.commit()
 
     async def get_all_tracks(self):
-        result = await self.session.execute(select(TrackInfo))
-        return result.scalars().all()
\ No newline at end of file
+        result = await self.session.execute(select(*TRACK_COLUMNS))
+        return result.all()
+
+    async def get_tracks_page(self, limit: int, after: Optional[tuple] = None, search: Optional[str] = None):
+        """Страница по ключу ((title, id) > курсора) — без OFFSET, стоимость не растёт к концу списка"""
+        query = select(*TRACK_COLUMNS).order_by(TrackInfo.title, TrackInfo.id).limit(limit + 1)
+        if after is not None:
+            query = query.where(tuple_(TrackInfo.title, TrackInfo.id) > tuple_(*after))
+        if search:
+            # Поиск подстроки по исполнителю и названию, покрыт триграммными индексами
+            pattern = f"%{escape_like(search)}%"
+            query = query.where(or_(
+                TrackInfo.title.ilike(pattern, escape="\\"),
+                TrackInfo.artist.ilike(pattern, escape="\\")
+            ))
+
+        result = await self.session.execute(query)
+        rows = result.all()
+        return rows[:limit], len(rows) > limit
+
+    async def stream_all_tracks(self):
+        result = await self.session.stream(
+            select(*TRACK_COLUMNS)
+            .order_by(TrackInfo.title, TrackInfo.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for row in result:
+            yield row
\ No newline at end of file
@@ -0,0 +1,52 @@
+import os
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from Core.profiler import profiler
+from DataBase.session import pool_stats
+
+router = APIRouter()
+
+# Профайлер включается по запросу, но только там, где это разрешено явно
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/db/pool", include_in_schema=False)
+async def db_pool():
+    # Состояние пулов соединений: сколько занято, сколько переполнения, сколько переподключений
+    return {name: stats.snapshot() for name, stats in pool_stats.items()}
+
+
+def require_profiler():
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+
+
+@router.get("/debug/profiler", include_in_schema=False)
+async def profiler_status():
+    require_profiler()
+    return profiler.status()
+
+
+@router.post("/debug/profiler/start", include_in_schema=False)
+async def profiler_start(interval_ms: float = Query(10, ge=1, le=1000)):
+    require_profiler()
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="Profiler is already running")
+    # Вызывается в потоке event loop — его и профилируем
+    profiler.start(interval_ms / 1000)
+    return profiler.status()
+
+
+@router.post("/debug/profiler/stop", include_in_schema=False, response_class=PlainTextResponse)
+async def profiler_stop():
+    """Свёрнутые стеки event loop за время работы профайлера"""
+    require_profiler()
+    return profiler.stop()
@@ -1,44 +1,105 @@
-from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 import asyncio
+import os
+from typing import Optional
 
-from DataBase.session import get_session
-from Schemas.track import TrackInfoResponse
+from DataBase.session import get_read_session
+from Schemas.track import TrackInfoResponse, UpNextTrack
 from Services.service import TrackService
 
 router = APIRouter()
 
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", 15))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", 3000))
+TRACK_INFO_MAX_AGE = int(os.getenv("TRACK_INFO_MAX_AGE", 0))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Слабое сравнение из If-None-Match: gzip в nginx превращает ETag в W/"…", и браузер шлёт его так"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
 @router.get("/track-info", response_model=TrackInfoResponse)
-async def get_track_info(request: Request, db: AsyncSession = Depends(get_session)):
-    redis = request.app.state.redis
-    service = TrackService(redis, db)
-    return await service.get_current_track_info()
+async def get_track_info(request: Request, db: AsyncSession = Depends(get_read_session)):
+    service = TrackService(
+        request.app.state.redis,
+        db,
+        cache=getattr(request.app.state, "now_playing_cache", None),
+        broadcaster=getattr(request.app.state, "track_broadcaster", None)
+    )
+    cached = await service.get_cached_track_info()
+
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": f"public, max-age={TRACK_INFO_MAX_AGE}, must-revalidate",
+    }
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+@router.get("/up-next", response_model=list[UpNextTrack])
+async def get_up_next(
+        request: Request,
+        limit: int = Query(10, ge=1, le=50),
+        db: AsyncSession = Depends(get_read_session)
+):
+    """Ближайшие треки эфира по очереди планировщика плеера"""
+    return await TrackService(request.app.state.redis, db).get_up_next(limit)
+
+
+def format_event(event_id: int, data: str) -> str:
+    return f"id: {event_id}\ndata: {data}\n\n"
 
 
 @router.get("/track-updates")
 async def track_updates(request: Request):
-    redis = request.app.state.redis
-    if not redis:
+    broadcaster = getattr(request.app.state, "track_broadcaster", None)
+    if not broadcaster:
         raise HTTPException(status_code=500, detail="Redis not initialized")
 
+    last_event_id = request.headers.get("last-event-id")
+
     async def event_stream():
-        pubsub = redis.pubsub()
-        await pubsub.subscribe("track_updates")
+        queue = broadcaster.subscribe()
 
         try:
-            while True:
-                message = await pubsub.get_message(ignore_subscribe_messages=True)
-                if message and message['channel'] == 'track_updates':
-                    yield f"data: {message['data']}\n\n"
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+
+            # Клиент переподключился — досылаем пропущенную смену трека
+            sent_id = 0
+            if last_event_id is not None:
+                missed = broadcaster.events_since(int(last_event_id)) if last_event_id.isdigit() else None
+                if missed is None and broadcaster.current_track:
+                    missed = [(broadcaster.last_event_id, broadcaster.current_track)]
+                for event_id, track in missed or []:
+                    sent_id = event_id
+                    yield format_event(event_id, track)
 
-                current_track = await redis.get("last_track")
-                if hasattr(event_stream, 'last_track') and event_stream.last_track != current_track:
-                    yield f"data: {current_track}\n\n"
+            while True:
+                try:
+                    event_id, track = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
 
-                event_stream.last_track = current_track
-                await asyncio.sleep(0.5)
+                if event_id > sent_id:
+                    sent_id = event_id
+                    yield format_event(event_id, track)
         finally:
-            await pubsub.unsubscribe("track_updates")
+            broadcaster.unsubscribe(queue)
 
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,64 +1,126 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+import zipfile
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from DataBase.session import get_session
+from DataBase.session import async_read_session, get_read_session, get_session
+from Repositories.catalog_repository import CatalogEventRepository
+from Repositories.ingest_queue_repository import IngestQueueRepository
+from Repositories.minio_repository import MinioRepository, get_minio_repository
+from Repositories.track_meta_repository import TrackMetaRepository
 from Repositories.track_repository import TrackRepository
-from Schemas.track import TrackSchema
-from Schemas.track_schema import TrackResponse
-from Services.track_service import TrackService
+from Schemas.track import TrackPage, TrackSchema
+from Schemas.track_schema import ImportReport, TrackResponse
+from Services.track_import_service import TrackImportService, archive_sources
+from Services.track_service import TrackService, export_tracks_json
 
 router = APIRouter(prefix="/tracks", tags=["tracks"])
 
 
-@router.post("/", response_model=TrackResponse)
-async def create_track(
-        mp3_file: UploadFile = File(...),
-        artist: str = Form(...),
-        title: str = Form(...),
-        cover_file: UploadFile = File(None),  # Опциональная загрузка файла
-        cover_url: str = Form(None),  # Опциональный URL
-        session: AsyncSession = Depends(get_session)
-):
-    # Проверка формата MP3
-    if not mp3_file.filename.endswith('.mp3'):
-        raise HTTPException(400, detail="Only MP3 files are allowed")
-
-    # Проверка формата изображения (если есть файл)
-    if cover_file and not any(
-            cover_file.filename.endswith(ext)
-            for ext in ['.jpg', '.jpeg', '.png']
-    ):
-        raise HTTPException(400, detail="Only JPG/PNG images are allowed")
-
-    track_repo = TrackRepository(session)
-    track_service = TrackService(track_repo)
-
-    track = await track_service.create_track(
-        mp3_file=mp3_file,
-        artist=artist,
-        title=title,
-        cover_file=cover_file,
-        cover_url=cover_url
+def get_track_service(
+        request: Request,
+        session: AsyncSession = Depends(get_session),
+        minio_repo: MinioRepository = Depends(get_minio_repository)
+) -> TrackService:
+    redis = request.app.state.redis
+    return TrackService(
+        TrackRepository(session),
+        TrackMetaRepository(redis),
+        CatalogEventRepository(redis),
+        minio_repo,
+        IngestQueueRepository(redis)
+    )
+
+
+def get_import_service(
+        request: Request,
+        session: AsyncSession = Depends(get_session),
+        minio_repo: MinioRepository = Depends(get_minio_repository)
+) -> TrackImportService:
+    redis = request.app.state.redis
+    return TrackImportService(
+        TrackRepository(session),
+        minio_repo,
+        TrackMetaRepository(redis),
+        CatalogEventRepository(redis),
+        IngestQueueRepository(redis)
     )
 
+
+# Описание формы для документации: тело разбирается вручную, потоком
+CREATE_TRACK_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["mp3_file", "artist", "title"],
+                    "properties": {
+                        "mp3_file": {"type": "string", "format": "binary"},
+                        "artist": {"type": "string"},
+                        "title": {"type": "string"},
+                        "cover_file": {"type": "string", "format": "binary"},
+                        "cover_url": {"type": "string"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+@router.post("/", response_model=TrackResponse, openapi_extra=CREATE_TRACK_FORM)
+async def create_track(request: Request, track_service: TrackService = Depends(get_track_service)):
+    # Файлы не буферизуются в UploadFile: проверка форматов и заливка в MinIO идут по ходу чтения тела
+    track, mp3 = await track_service.create_track_stream(request)
+
     return TrackResponse(
+        id=track.id,
         artist=track.artist,
         title=track.title,
         cover_url=track.cover_url,
-        mp3_url=track.mp3_url
+        mp3_url=track.mp3_url,
+        duration=mp3.duration,
+        sha256=mp3.checksum
     )
 
 
-@router.delete("/{title}")
-async def delete_track(title: str, session: AsyncSession = Depends(get_session)):
-    track_repo = TrackRepository(session)
-    track_service = TrackService(track_repo)
-    return await track_service.delete_track(title)
+@router.post("/import", response_model=ImportReport)
+async def import_tracks(
+        archive: UploadFile = File(...),
+        import_service: TrackImportService = Depends(get_import_service)
+):
+    # ZIP с mp3 и необязательным manifest.json; теги и обложки берутся из ID3
+    try:
+        with zipfile.ZipFile(archive.file) as zf:
+            return await import_service.import_sources(archive_sources(zf))
+    except zipfile.BadZipFile:
+        raise HTTPException(400, detail="Expected a ZIP archive")
+    except ValueError:
+        raise HTTPException(400, detail="Invalid manifest.json")
+
+
+@router.delete("/{track_id}")
+async def delete_track(track_id: int, track_service: TrackService = Depends(get_track_service)):
+    return await track_service.delete_track(track_id)
+
+
+@router.get("/", response_model=TrackPage)
+async def get_tracks(
+        limit: int = Query(50, ge=1, le=500),
+        cursor: Optional[str] = None,
+        q: Optional[str] = Query(None, min_length=1, max_length=100),
+        session: AsyncSession = Depends(get_read_session)
+):
+    # Только чтение — идёт на реплику, если она настроена
+    return await TrackService(TrackRepository(session)).get_tracks_page(limit, cursor, q)
 
 
 @router.get("/all", response_model=list[TrackSchema])
-async def get_all_tracks(session: AsyncSession = Depends(get_session)):
-    track_repository = TrackRepository(session)
-    track_service = TrackService(track_repository)
-    return await track_service.get_all_tracks()
+async def get_all_tracks():
+    # Полный экспорт отдаётся потоком; сессия своя — зависимость закроется раньше, чем ответ допишется
+    return StreamingResponse(export_tracks_json(async_read_session), media_type="application/json")
 
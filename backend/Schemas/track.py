@@ -1,15 +1,40 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class TrackInfoResponse(BaseModel):
     artist: str
     title: str
     cover_url: str
+    duration: Optional[float] = None  # Длительность, сек
+    started_at: Optional[float] = None  # Unix-время начала трека у плеера
+    seq: Optional[int] = None  # Порядковый номер смены трека
+    rtp_timestamp: Optional[int] = None  # RTP-время первого пакета трека в эфире
+    rtp_seq: Optional[int] = None  # Номер этого пакета
+    ssrc: Optional[int] = None  # Поток станции, к которому относятся rtp_timestamp и rtp_seq
+    gain: Optional[float] = None  # Поправка громкости, дБ
+    waveform: Optional[str] = None  # base64 от пиков 0..255 для отрисовки волны
+    covers: Optional[dict[str, dict[str, str]]] = None  # Миниатюры обложки: {размер: {формат: ключ}}
+
+class UpNextTrack(BaseModel):
+    key: str  # Ключ mp3 в бакете
+    artist: Optional[str] = None
+    title: Optional[str] = None
+    cover_url: Optional[str] = None
+    duration: Optional[float] = None
+    covers: Optional[dict[str, dict[str, str]]] = None
 
 class TrackSchema(BaseModel):
+    id: Optional[int] = None
     artist: str
     title: str
     cover_url: str
     mp3_url: str
+    duration: Optional[float] = None
+    covers: Optional[dict[str, dict[str, str]]] = None
 
     class Config:
-        from_attributes = True  # Ранее known as orm_mode
\ No newline at end of file
+        from_attributes = True  # Ранее known as orm_mode
+
+class TrackPage(BaseModel):
+    items: list[TrackSchema]
+    next_cursor: Optional[str] = None  # Передать в cursor, чтобы получить следующую страницу
@@ -9,7 +9,17 @@ class TrackCreate(BaseModel):
     cover_url: Optional[str] = None  # URL обложки (альтернатива файлу)
 
 class TrackResponse(BaseModel):
+    id: Optional[int] = None
     artist: str
     title: str
     cover_url: str
-    mp3_url: str
\ No newline at end of file
+    mp3_url: str
+    duration: Optional[float] = None  # Длительность, сек — считается по кадрам при загрузке
+    sha256: Optional[str] = None  # Контрольная сумма mp3
+class ImportFailure(BaseModel):
+    file: str
+    error: str
+
+class ImportReport(BaseModel):
+    imported: int
+    failed: list[ImportFailure] = []
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import io
+import os
+from typing import Optional
+
+from PIL import Image, ImageOps, features
+
+from Repositories.minio_repository import MinioRepository, run_blocking
+
+# Обложка в плеере — 200px, вдвое больше для HiDPI, маленькая — для списков
+COVER_SIZES = tuple(int(size) for size in os.getenv("COVER_SIZES", "64,200,400").split(","))
+COVER_PREFIX = os.getenv("COVER_PREFIX", "thumbs/")
+COVER_WEBP_QUALITY = int(os.getenv("COVER_WEBP_QUALITY", 80))
+COVER_AVIF_QUALITY = int(os.getenv("COVER_AVIF_QUALITY", 60))
+# AVIF меньше WebP, но кодируется заметно дольше и есть не во всех сборках Pillow
+COVER_AVIF = os.getenv("COVER_AVIF", "true").lower() in ("1", "true", "yes") and features.check("avif")
+# Имя объекта содержит хэш исходника — содержимое по этому адресу не меняется никогда
+COVER_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": COVER_WEBP_QUALITY, "method": 6}),
+    "avif": ("AVIF", "image/avif", {"quality": COVER_AVIF_QUALITY}),
+}
+
+
+def is_bucket_cover(cover_url: Optional[str]) -> bool:
+    return bool(cover_url) and not cover_url.startswith(("http://", "https://"))
+
+
+def make_thumbnails(data: bytes) -> tuple[dict, list[tuple]]:
+    """Уменьшенные копии обложки: ({размер: {формат: ключ}}, [(ключ, content-type, байты)]); синхронно"""
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    formats = ["webp", "avif"] if COVER_AVIF else ["webp"]
+
+    image = Image.open(io.BytesIO(data))
+    # JPEG умеет декодироваться сразу в уменьшенном масштабе — не разжимаем мегапиксели зря
+    image.draft("RGB", (max(COVER_SIZES), max(COVER_SIZES)))
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    variants, objects = {}, []
+    for size in sorted(COVER_SIZES, reverse=True):
+        # Каждый размер — из предыдущего, крупного: дешевле, чем каждый раз из исходника
+        image = image.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        variants[str(size)] = {}
+        for name in formats:
+            pil_format, content_type, options = _FORMATS[name]
+            buffer = io.BytesIO()
+            image.save(buffer, pil_format, **options)
+            key = f"{COVER_PREFIX}{digest}/{size}.{name}"
+            variants[str(size)][name] = key
+            objects.append((key, content_type, buffer.getvalue()))
+    return variants, objects
+
+
+class CoverService:
+    """Миниатюры обложек в бакете image: генерируются один раз при импорте, кэшируются навсегда"""
+
+    def __init__(self, minio_repo: MinioRepository):
+        self.minio_repo = minio_repo
+
+    async def _read(self, cover_url: str) -> bytes:
+        def get_object():
+            response = self.minio_repo.client.get_object("image", cover_url)
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
+
+        return await run_blocking(get_object)
+
+    async def generate(self, cover_url: str) -> Optional[dict]:
+        if not is_bucket_cover(cover_url):
+            return None
+
+        data = await self._read(cover_url)
+        variants, objects = await asyncio.to_thread(make_thumbnails, data)
+        await asyncio.gather(*(
+            self.minio_repo.upload_bytes(
+                "image", key, body, content_type, metadata={"Cache-Control": COVER_CACHE_CONTROL}
+            )
+            for key, content_type, body in objects
+        ))
+        return variants
@@ -0,0 +1,165 @@
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+import numpy as np
+
+from Core.loudness import SAMPLE_RATE, LoudnessMeter
+from Repositories.minio_repository import MinioRepository, run_blocking
+from Repositories.track_meta_repository import TrackMetaRepository
+from Repositories.track_repository import TrackRepository
+from Services.cover_service import CoverService, is_bucket_cover
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+# Опорный уровень ReplayGain 2.0; для стриминга часто берут -14 или -16
+LOUDNESS_TARGET = float(os.getenv("LOUDNESS_TARGET", -18))
+WAVEFORM_POINTS = int(os.getenv("WAVEFORM_POINTS", 200))
+DECODE_CHUNK_FRAMES = SAMPLE_RATE * 5
+CHANNELS = 2
+
+
+@dataclass
+class AudioAnalysis:
+    duration: float
+    bitrate: Optional[int]
+    loudness: Optional[float]  # Интегральная громкость, LUFS
+    peak: float  # Сэмпл-пик, 0..1
+    gain: Optional[float]  # Поправка до LOUDNESS_TARGET в дБ, не выше запаса до клиппинга
+    waveform: bytes
+    size: Optional[int] = None
+
+    def fields(self) -> dict:
+        return {
+            "size": self.size,
+            "duration": self.duration,
+            "bitrate": self.bitrate,
+            "loudness": self.loudness,
+            "peak": self.peak,
+            "gain": self.gain,
+            "waveform": self.waveform,
+        }
+
+
+def replay_gain(loudness: Optional[float], peak: float) -> Optional[float]:
+    if loudness is None:
+        return None
+    gain = LOUDNESS_TARGET - loudness
+    if peak > 0:
+        gain = min(gain, -20 * np.log10(peak))
+    return round(float(gain), 2)
+
+
+def analyze_audio(source: str, size: Optional[int] = None) -> AudioAnalysis:
+    """Декодирует файл ffmpeg'ом в PCM 48 кГц и считает всё за один проход; синхронно, для потока"""
+    # stderr — во временный файл: на битом файле ffmpeg пишет ошибку на каждый кадр, и полный пайп,
+    # который никто не читает, остановил бы его вместе с нашим чтением stdout
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.Popen(
+            [FFMPEG_BIN, "-nostdin", "-v", "error", "-i", source,
+             "-f", "f32le", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE), "pipe:1"],
+            stdout=subprocess.PIPE,
+            stderr=log
+        )
+        meter, returncode = _measure(process)
+        log.seek(0)
+        stderr = log.read(4096).decode(errors="replace")
+
+    if returncode != 0 or not meter.samples:
+        raise RuntimeError(f"ffmpeg failed ({returncode}): {stderr.strip()[:500]}")
+
+    meter.finish()
+    loudness = meter.integrated_loudness()
+    duration = meter.duration
+    return AudioAnalysis(
+        duration=round(duration, 3),
+        bitrate=int(size * 8 / duration) if size and duration else None,
+        loudness=round(loudness, 2) if loudness is not None else None,
+        peak=round(meter.peak, 5),
+        gain=replay_gain(loudness, meter.peak),
+        waveform=meter.waveform(WAVEFORM_POINTS),
+    )
+
+
+def _measure(process: subprocess.Popen) -> tuple[LoudnessMeter, int]:
+    meter = LoudnessMeter(CHANNELS)
+    frame_bytes = 4 * CHANNELS
+    rest = b""
+    try:
+        while True:
+            chunk = process.stdout.read(DECODE_CHUNK_FRAMES * frame_bytes)
+            if not chunk:
+                break
+            chunk = rest + chunk
+            whole = len(chunk) - len(chunk) % frame_bytes
+            rest = chunk[whole:]
+            meter.feed(np.frombuffer(chunk[:whole], dtype=np.float32).reshape(-1, CHANNELS))
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+    return meter, returncode
+
+
+class IngestService:
+    """Обработка одного трека: анализ аудио и миниатюры обложки, только то, чего ещё нет в базе"""
+
+    def __init__(self, session_factory, minio_repo: MinioRepository, meta_repo: TrackMetaRepository):
+        self.session_factory = session_factory
+        self.minio_repo = minio_repo
+        self.meta_repo = meta_repo
+        self.cover_service = CoverService(minio_repo)
+
+    async def process(self, raw_job: str) -> dict:
+        job = json.loads(raw_job)
+        async with self.session_factory() as session:
+            track = await TrackRepository(session).get_track_by_id(job["track_id"])
+        if not track:
+            return {}
+
+        fields, meta = {}, {}
+        if track.peak is None:
+            analysis = await self.analyze(track.mp3_url)
+            fields.update(analysis.fields())
+            meta.update(self.meta_fields(analysis))
+        if track.covers is None and is_bucket_cover(track.cover_url):
+            try:
+                covers = await self.cover_service.generate(track.cover_url)
+                fields["covers"] = covers
+                meta["covers"] = json.dumps(covers)
+            except Exception as e:
+                # Битая обложка не должна терять результаты анализа аудио; клиенты останутся на cover_url
+                print(f"Cover thumbnails error {track.cover_url}: {e}")
+
+        if fields:
+            async with self.session_factory() as session:
+                await TrackRepository(session).update_analysis(track.id, **fields)
+            await self.meta_repo.update(track.mp3_url, **meta)
+        return fields
+
+    async def analyze(self, mp3_url: str) -> AudioAnalysis:
+        # ffmpeg читает объект сам по presigned-ссылке — без промежуточного файла
+        client = self.minio_repo.client
+        stat = await run_blocking(client.stat_object, "media", mp3_url)
+        url = await run_blocking(client.presigned_get_object, "media", mp3_url, expires=timedelta(hours=1))
+        analysis = await asyncio.to_thread(analyze_audio, url, stat.size)
+        analysis.size = stat.size
+        return analysis
+
+    @staticmethod
+    def meta_fields(analysis: AudioAnalysis) -> dict:
+        # Плееру нужны поправка громкости и волна для now_playing; волна — base64 от байтов
+        return {
+            "duration": analysis.duration,
+            "bitrate": analysis.bitrate,
+            "gain": analysis.gain,
+            "waveform": base64_waveform(analysis.waveform),
+        }
+
+
+def base64_waveform(waveform: bytes) -> Optional[str]:
+    return base64.b64encode(waveform).decode() if waveform else None
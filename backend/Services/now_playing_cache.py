@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from redis.asyncio import Redis
+
+TRACK_INFO_CACHE_KEY = "track_info_cache"
+TRACK_INFO_REDIS_CACHE = os.getenv("TRACK_INFO_REDIS_CACHE", "true").lower() == "true"
+TRACK_INFO_NEGATIVE_TTL = float(os.getenv("TRACK_INFO_NEGATIVE_TTL", 5))
+
+
+@dataclass
+class CachedTrackInfo:
+    track_name: str
+    info: Optional[dict]
+    body: bytes
+    etag: str
+    expires_at: Optional[float] = None
+
+    @classmethod
+    def build(cls, track_name: str, info: Optional[dict]) -> "CachedTrackInfo":
+        body = json.dumps(info, ensure_ascii=False, separators=(",", ":")).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        # Отсутствие трека в базе кэшируем ненадолго — запись могут добавить следом
+        expires_at = None if info else time.monotonic() + TRACK_INFO_NEGATIVE_TTL
+        return cls(track_name, info, body, etag, expires_at)
+
+    def is_fresh(self, track_name: str) -> bool:
+        if self.track_name != track_name:
+            return False
+        return self.expires_at is None or time.monotonic() < self.expires_at
+
+
+class NowPlayingCache:
+    """Кэш ответа /track-info: собирается один раз на смену трека, а не на каждый запрос"""
+
+    def __init__(self, redis: Redis, use_redis: bool = TRACK_INFO_REDIS_CACHE):
+        self.redis = redis
+        self.use_redis = use_redis
+        self._entry: Optional[CachedTrackInfo] = None
+        self._lock = asyncio.Lock()
+
+    async def get(
+            self,
+            track_name: str,
+            loader: Callable[[str], Awaitable[Optional[dict]]]
+    ) -> CachedTrackInfo:
+        entry = self._entry
+        if entry and entry.is_fresh(track_name):
+            return entry
+
+        # Всплеск запросов после смены трека ждёт одну сборку, а не идёт в базу толпой
+        async with self._lock:
+            entry = self._entry
+            if entry and entry.is_fresh(track_name):
+                return entry
+
+            info = await self._load_from_redis(track_name)
+            if info is None:
+                info = await loader(track_name)
+                if info:
+                    await self._save_to_redis(track_name, info)
+
+            self._entry = CachedTrackInfo.build(track_name, info)
+            return self._entry
+
+    async def _load_from_redis(self, track_name: str) -> Optional[dict]:
+        if not self.use_redis:
+            return None
+        try:
+            raw = await self.redis.get(TRACK_INFO_CACHE_KEY)
+        except Exception as e:
+            print(f"Track info cache read error: {e}")
+            return None
+        if not raw:
+            return None
+        cached = json.loads(raw)
+        if cached.get("track_name") != track_name:
+            return None
+        return cached.get("info")
+
+    async def _save_to_redis(self, track_name: str, info: dict):
+        if not self.use_redis:
+            return
+        try:
+            await self.redis.set(
+                TRACK_INFO_CACHE_KEY,
+                json.dumps({"track_name": track_name, "info": info}, ensure_ascii=False)
+            )
+        except Exception as e:
+            print(f"Track info cache write error: {e}")
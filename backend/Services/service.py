@@ -1,32 +1,116 @@
+import base64
+import json
+
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
+from typing import Optional
 
+from Repositories.schedule_repository import ScheduleRepository
+from Repositories.track_meta_repository import TrackMetaRepository
 from Repositories.track_repository import TrackRepository
-from Schemas.track import TrackInfoResponse
+from Schemas.track import TrackInfoResponse, UpNextTrack
+from Services.now_playing_cache import CachedTrackInfo, NowPlayingCache
+from Services.track_broadcaster import LAST_TRACK_KEY, NOW_PLAYING_KEY, TrackBroadcaster, parse_now_playing
 
 
 class TrackService:
-    def __init__(self, redis: Redis, session: AsyncSession):
+    def __init__(
+            self,
+            redis: Redis,
+            session: AsyncSession,
+            cache: Optional[NowPlayingCache] = None,
+            broadcaster: Optional[TrackBroadcaster] = None
+    ):
         self.redis = redis
         self.repo = TrackRepository(session)
+        self.cache = cache
+        self.broadcaster = broadcaster
+
+    async def get_now_playing(self) -> Optional[dict]:
+        # Бродкастер держит актуальный трек в памяти — лишний GET в Redis не нужен
+        if self.broadcaster and self.broadcaster.now_playing:
+            return self.broadcaster.now_playing
+        return parse_now_playing(
+            await self.redis.get(NOW_PLAYING_KEY) or await self.redis.get(LAST_TRACK_KEY)
+        )
 
-    async def get_current_track_info(self) -> TrackInfoResponse:
-        track_name = await self.redis.get("last_track")
-        if not track_name:
+    async def get_cached_track_info(self) -> CachedTrackInfo:
+        now_playing = await self.get_now_playing()
+        if not now_playing or not now_playing.get("key"):
             raise HTTPException(status_code=404, detail="No track in Redis")
 
-        clean_name = track_name.replace('.mp3', '').strip()
-        track = await self.repo.get_track_by_title(clean_name)
+        # seq меняется на каждом старте трека, даже если тот же файл играет повторно
+        cache_key = f"{now_playing.get('seq', '')}:{now_playing['key']}"
 
-        if not track:
+        async def loader(_):
+            return await self._load_track_info(now_playing)
+
+        if self.cache:
+            cached = await self.cache.get(cache_key, loader)
+        else:
+            cached = CachedTrackInfo.build(cache_key, await loader(cache_key))
+
+        if not cached.info:
             raise HTTPException(
                 status_code=404,
-                detail=f"Track '{clean_name}' not found in database"
+                detail=f"Track '{self._clean_name(now_playing['key'])}' not found in database"
             )
+        return cached
+
+    async def _load_track_info(self, now_playing: dict) -> Optional[dict]:
+        # Плеер уже подтянул метаданные — база не нужна
+        if now_playing.get("title"):
+            return TrackInfoResponse(
+                artist=now_playing.get("artist") or "",
+                title=now_playing["title"],
+                cover_url=now_playing.get("cover_url") or "",
+                duration=now_playing.get("duration"),
+                gain=now_playing.get("gain"),
+                waveform=now_playing.get("waveform"),
+                covers=now_playing.get("covers"),
+                started_at=now_playing.get("started_at"),
+                seq=now_playing.get("seq"),
+                rtp_timestamp=now_playing.get("rtp_timestamp"),
+                rtp_seq=now_playing.get("rtp_seq"),
+                ssrc=now_playing.get("ssrc")
+            ).model_dump()
+
+        track = await self.repo.get_track_by_mp3_url(now_playing["key"])
+        if not track:
+            return None
 
         return TrackInfoResponse(
             artist=track.artist,
             title=track.title,
-            cover_url=track.cover_url
-        )
+            cover_url=track.cover_url,
+            duration=track.duration,
+            gain=track.gain,
+            waveform=base64.b64encode(track.waveform).decode() if track.waveform else None,
+            covers=track.covers,
+            started_at=now_playing.get("started_at"),
+            seq=now_playing.get("seq"),
+            rtp_timestamp=now_playing.get("rtp_timestamp"),
+            rtp_seq=now_playing.get("rtp_seq"),
+            ssrc=now_playing.get("ssrc")
+        ).model_dump()
+
+    async def get_up_next(self, limit: int) -> list[UpNextTrack]:
+        # Очередь и метаданные — из Redis, как у плеера; база не нужна
+        keys = await ScheduleRepository(self.redis).upcoming(limit)
+        metas = await TrackMetaRepository(self.redis).get_many(keys) if keys else []
+        return [
+            UpNextTrack(
+                key=key,
+                artist=meta.get("artist"),
+                title=meta.get("title"),
+                cover_url=meta.get("cover_url"),
+                duration=float(meta["duration"]) if meta.get("duration") else None,
+                covers=json.loads(meta["covers"]) if meta.get("covers") else None
+            )
+            for key, meta in zip(keys, metas)
+        ]
+
+    @staticmethod
+    def _clean_name(track_name: str) -> str:
+        return track_name.replace('.mp3', '').strip()
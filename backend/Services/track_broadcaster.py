@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Optional
+
+from redis.asyncio import Redis
+
+TRACK_UPDATES_CHANNEL = "track_updates"
+LAST_TRACK_KEY = "last_track"
+NOW_PLAYING_KEY = "now_playing"
+
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", 16))
+RECONNECT_DELAY = float(os.getenv("SSE_RECONNECT_DELAY", 1))
+HISTORY_SIZE = int(os.getenv("SSE_HISTORY_SIZE", 32))
+
+
+def parse_now_playing(payload: Optional[str]) -> Optional[dict]:
+    """Документ now playing от плеера; старый плеер присылает только имя файла"""
+    if not payload:
+        return None
+    if payload.startswith("{"):
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+    return {"key": payload}
+
+
+class TrackBroadcaster:
+    """Одна подписка на track_updates на процесс, события раздаются по очередям клиентов.
+
+    id события — seq из документа now playing, который плеер берёт из общего счётчика в Redis:
+    он одинаков во всех воркерах и переживает рестарт, так что Last-Event-ID понятен любому процессу.
+    """
+
+    def __init__(self, redis: Redis, queue_size: int = SUBSCRIBER_QUEUE_SIZE, history_size: int = HISTORY_SIZE):
+        self.redis = redis
+        self.queue_size = queue_size
+        self.current_track = None
+        self.now_playing: Optional[dict] = None
+        self.last_event_id = 0
+        self._history = deque(maxlen=history_size)
+        self._subscribers: set[asyncio.Queue] = set()
+        self._task = None
+
+    async def start(self):
+        self._set_current(await self._read_current())
+        if self.current_track:
+            # Свежий воркер сразу может дослать текущий трек тому, кто отстал на одно событие
+            self._history.append((self.last_event_id, self.current_track))
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def events_since(self, event_id: int) -> Optional[list[tuple[int, str]]]:
+        """События после event_id; None, если id уже вытеснен из истории"""
+        if event_id >= self.last_event_id:
+            # Клиент видел это событие или более новое — другой воркер мог получить его раньше нас
+            return []
+        if self._history and event_id >= self._history[0][0] - 1:
+            return [event for event in self._history if event[0] > event_id]
+        return None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(TRACK_UPDATES_CHANNEL)
+
+                # Пока подписки не было, трек мог смениться — сверяемся с Redis
+                current_track = await self._read_current()
+                if current_track and current_track != self.current_track:
+                    self._publish(current_track)
+
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._publish(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Track broadcaster error: {e}")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+
+    async def _read_current(self) -> Optional[str]:
+        return await self.redis.get(NOW_PLAYING_KEY) or await self.redis.get(LAST_TRACK_KEY)
+
+    def _set_current(self, track: Optional[str]):
+        self.current_track = track
+        self.now_playing = parse_now_playing(track)
+        seq = (self.now_playing or {}).get("seq")
+        if isinstance(seq, int):
+            self.last_event_id = seq
+        elif track:
+            # Старый плеер без seq — нумеруем сами, в пределах процесса
+            self.last_event_id += 1
+
+    def _publish(self, track):
+        previous_id = self.last_event_id
+        self._set_current(track)
+        if self.last_event_id == previous_id:
+            return  # То же событие пришло повторно, например после переподписки
+        if self.last_event_id < previous_id:
+            self._history.clear()  # Счётчик в Redis сброшен — старые id больше ничего не значат
+        event = (self.last_event_id, track)
+        self._history.append(event)
+        for queue in self._subscribers:
+            # Медленный клиент теряет самое старое событие, а не тормозит остальных
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
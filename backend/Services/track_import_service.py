@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import os
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from Core.id3 import read_tags
+from Core.mp3 import Mp3Scanner
+from Repositories.catalog_repository import CatalogEventRepository
+from Repositories.ingest_queue_repository import IngestQueueRepository
+from Repositories.minio_repository import MinioRepository
+from Repositories.track_meta_repository import TrackMetaRepository
+from Repositories.track_repository import TrackRepository
+from Schemas.track_schema import ImportFailure, ImportReport
+
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", 8))
+MANIFEST_NAME = "manifest.json"
+
+_COVER_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png"}
+
+
+@dataclass
+class ImportSource:
+    """Файл для импорта: имя объекта в MinIO и функция, читающая его содержимое"""
+    filename: str
+    read: Callable[[], bytes]
+    meta: Optional[dict] = None  # Поля из манифеста, перекрывают ID3
+    path: Optional[str] = None  # Путь внутри архива или папки — для отчёта
+
+    def __post_init__(self):
+        self.path = self.path or self.filename
+
+
+@dataclass
+class ImportedTrack:
+    artist: str
+    title: str
+    cover_url: str
+    mp3_url: str
+    duration: Optional[float] = None
+    bitrate: Optional[int] = None
+    etag: Optional[str] = None
+    size: int = 0
+
+    def row(self) -> dict:
+        return {
+            "artist": self.artist,
+            "title": self.title,
+            "cover_url": self.cover_url,
+            "mp3_url": self.mp3_url,
+            "duration": self.duration,
+            "bitrate": self.bitrate,
+            "size": self.size,
+        }
+
+
+@dataclass
+class PreparedTrack:
+    source: ImportSource
+    data: bytes
+    artist: str
+    title: str
+    cover: Optional[tuple] = None  # (имя в бакете image, mime, байты)
+    cover_url: str = ""
+    duration: Optional[float] = None
+    bitrate: Optional[int] = None
+
+
+def _split_filename(filename: str):
+    """'Исполнитель - Название.mp3' — запасной вариант, если в файле нет тегов"""
+    stem = Path(filename).stem
+    if " - " in stem:
+        artist, title = stem.split(" - ", 1)
+        return artist.strip(), title.strip()
+    return "", stem.strip()
+
+
+def prepare_track(source: ImportSource) -> PreparedTrack:
+    """Чтение файла, теги и длительность — синхронно, вызывается в потоке"""
+    data = source.read()
+    tags = read_tags(data)
+    meta = source.meta or {}
+
+    scanner = Mp3Scanner()
+    scanner.feed(data)
+
+    artist, title = _split_filename(source.filename)
+    track = PreparedTrack(
+        source=source,
+        data=data,
+        artist=meta.get("artist") or tags.get("artist") or artist,
+        title=meta.get("title") or tags.get("title") or title,
+        cover_url=meta.get("cover_url") or "",
+        duration=round(scanner.duration, 3) if scanner.frames else None,
+        bitrate=scanner.bitrate if scanner.frames else None,
+    )
+
+    if not track.cover_url and "cover" in tags:
+        mime, picture = tags["cover"]
+        # Имя по содержимому: одна обложка альбома заливается один раз на все его треки
+        name = hashlib.sha1(picture).hexdigest() + _COVER_EXTENSIONS.get(mime, ".jpg")
+        track.cover = (name, mime, picture)
+        track.cover_url = name
+    return track
+
+
+def directory_sources(directory: str) -> list[ImportSource]:
+    root = Path(directory)
+    manifest = _load_manifest(root / MANIFEST_NAME) if (root / MANIFEST_NAME).is_file() else {}
+    sources = []
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and path.suffix.lower() == ".mp3":
+            relative = path.relative_to(root).as_posix()
+            sources.append(ImportSource(path.name, path.read_bytes, manifest.get(relative), relative))
+    return sources
+
+
+def archive_sources(archive: zipfile.ZipFile) -> list[ImportSource]:
+    names = set(archive.namelist())
+    manifest = json.loads(archive.read(MANIFEST_NAME)) if MANIFEST_NAME in names else []
+    manifest = _index_manifest(manifest)
+    sources = []
+    for info in archive.infolist():
+        if not info.is_dir() and info.filename.lower().endswith(".mp3"):
+            read = lambda name=info.filename: archive.read(name)
+            sources.append(ImportSource(Path(info.filename).name, read, manifest.get(info.filename), info.filename))
+    return sources
+
+
+def _drop_name_collisions(sources: Iterable[ImportSource]) -> tuple[list[ImportSource], list[ImportFailure]]:
+    """Ключ в MinIO — имя файла без папок: одноимённые файлы из разных папок затёрли бы друг друга.
+    Берём первый по пути, остальные попадают в отчёт"""
+    kept: dict[str, ImportSource] = {}
+    failed = []
+    for source in sorted(sources, key=lambda source: source.path):
+        first = kept.setdefault(source.filename, source)
+        if first is not source:
+            failed.append(ImportFailure(
+                file=source.path, error=f"File name '{source.filename}' is already used by '{first.path}'"
+            ))
+    return list(kept.values()), failed
+
+
+def _load_manifest(path: Path) -> dict:
+    return _index_manifest(json.loads(path.read_text(encoding="utf-8")))
+
+
+def _index_manifest(entries: list) -> dict:
+    """Манифест — список {"file": путь внутри архива/папки, "artist", "title", "cover_url"}"""
+    return {entry["file"]: entry for entry in entries if entry.get("file")}
+
+
+class TrackImportService:
+    """Массовый импорт: параллельная заливка в MinIO, одна транзакция на все записи в базе"""
+
+    def __init__(
+            self,
+            track_repo: TrackRepository,
+            minio_repo: MinioRepository,
+            meta_repo: Optional[TrackMetaRepository] = None,
+            catalog_repo: Optional[CatalogEventRepository] = None,
+            ingest_repo: Optional[IngestQueueRepository] = None,
+            concurrency: int = IMPORT_CONCURRENCY
+    ):
+        self.track_repo = track_repo
+        self.minio_repo = minio_repo
+        self.meta_repo = meta_repo
+        self.catalog_repo = catalog_repo
+        self.ingest_repo = ingest_repo
+        self.concurrency = concurrency
+        self._covers: dict[str, asyncio.Task] = {}
+
+    async def import_sources(self, sources: Iterable[ImportSource]) -> ImportReport:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        sources, failed = _drop_name_collisions(sources)
+
+        async def run(source: ImportSource):
+            async with semaphore:
+                try:
+                    return await self._import_one(source)
+                except Exception as e:
+                    print(f"Import error {source.path}: {e}")
+                    failed.append(ImportFailure(file=source.path, error=str(e)))
+
+        results = await asyncio.gather(*(run(source) for source in sources))
+
+        # Один файл — одна строка: повтор внутри пачки ON CONFLICT не переживёт
+        tracks = list({track.mp3_url: track for track in results if track}.values())
+        if tracks:
+            saved = await self.track_repo.upsert_tracks([track.row() for track in tracks])
+            if self.meta_repo:
+                await self.meta_repo.sync(tracks, extra_fields=("duration", "bitrate"))
+            if self.catalog_repo:
+                await self.catalog_repo.tracks_added(
+                    "media", [(track.mp3_url, track.etag, track.size) for track in tracks]
+                )
+            if self.ingest_repo:
+                await self.ingest_repo.enqueue_many(saved)
+        return ImportReport(imported=len(tracks), failed=failed)
+
+    async def _import_one(self, source: ImportSource) -> ImportedTrack:
+        prepared = await asyncio.to_thread(prepare_track, source)
+        if not prepared.duration:
+            raise ValueError("No MPEG audio frames found")
+        if not prepared.title:
+            raise ValueError("No title in tags or file name")
+
+        uploads = [self.minio_repo.upload_bytes("media", source.filename, prepared.data, "audio/mpeg")]
+        if prepared.cover:
+            uploads.append(self._upload_cover(*prepared.cover))
+        result, *_ = await asyncio.gather(*uploads)
+
+        return ImportedTrack(
+            artist=prepared.artist,
+            title=prepared.title,
+            cover_url=prepared.cover_url,
+            mp3_url=source.filename,
+            duration=prepared.duration,
+            bitrate=prepared.bitrate,
+            etag=getattr(result, "etag", None),
+            size=len(prepared.data),
+        )
+
+    async def _upload_cover(self, name: str, mime: str, data: bytes):
+        task = self._covers.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self.minio_repo.upload_bytes("image", name, data, mime))
+            self._covers[name] = task
+        return await task
@@ -1,17 +1,36 @@
-from fastapi import UploadFile, HTTPException
+from fastapi import HTTPException, Request
+from sqlalchemy.exc import IntegrityError
 
+import base64
+import json
 import os
+from typing import Optional
 
+from Repositories.catalog_repository import CatalogEventRepository
+from Repositories.ingest_queue_repository import IngestQueueRepository
 from Repositories.minio_repository import MinioRepository
+from Repositories.track_meta_repository import TrackMetaRepository
 from Repositories.track_repository import TrackRepository
+from Schemas.track import TrackPage, TrackSchema
 from Schemas.track_schema import TrackResponse
+from Services.track_upload_service import StreamingTrackUpload
 
 
 
 class TrackService:
-    def __init__(self, track_repo: TrackRepository):
-        self.minio_repo = MinioRepository()
+    def __init__(
+            self,
+            track_repo: TrackRepository,
+            meta_repo: Optional[TrackMetaRepository] = None,
+            catalog_repo: Optional[CatalogEventRepository] = None,
+            minio_repo: Optional[MinioRepository] = None,
+            ingest_repo: Optional[IngestQueueRepository] = None
+    ):
+        self.minio_repo = minio_repo
         self.track_repo = track_repo
+        self.meta_repo = meta_repo
+        self.catalog_repo = catalog_repo
+        self.ingest_repo = ingest_repo
 
     async def get_track_info(self, title: str) -> TrackResponse:
         track = await self.track_repo.get_track_by_title(title)
@@ -29,52 +48,113 @@ class TrackService:
         # Возвращаем как TrackInfoResponse
         return TrackResponse.from_track_response(track_response)
 
-    async def create_track(
-            self,
-            mp3_file: UploadFile,
-            artist: str,
-            title: str,
-            cover_file: UploadFile = None,
-            cover_url: str = None
-    ):
-        # Сохраняем точное имя файла MP3
-        mp3_filename = mp3_file.filename
-
-        # Загружаем MP3 в MinIO (в бакет media)
-        await self.minio_repo.upload_mp3(mp3_file.file, mp3_filename)
-
-        # Обрабатываем обложку
-        final_cover_url = cover_url
-        if cover_file:
-            cover_filename = cover_file.filename
-            # Загружаем обложку в MinIO (в бакет image)
-            await self.minio_repo.upload_image(cover_file.file, cover_filename)
-            # Сохраняем только имя файла без префикса
-            final_cover_url = cover_filename
-
-        # Создаем запись в базе данных
+    async def create_track_stream(self, request: Request):
+        """Создание трека из multipart-запроса, который заливается в MinIO прямо по ходу чтения"""
+        upload = StreamingTrackUpload(self.minio_repo, check_file=self._check_new_file)
+        await upload.receive(request)
+
+        artist = upload.fields.get("artist")
+        title = upload.fields.get("title")
+        mp3 = upload.files.get("mp3_file")
+        cover = upload.files.get("cover_file")
+        if not artist or not title or not mp3:
+            await upload.discard()
+            raise HTTPException(422, detail="Fields 'artist', 'title' and 'mp3_file' are required")
+
         track_data = {
             "artist": artist,
             "title": title,
-            "cover_url": final_cover_url,  # Только имя файла или внешний URL
-            "mp3_url": mp3_filename  # Только имя файла без префикса
+            "cover_url": cover.key if cover else upload.fields.get("cover_url"),
+            "mp3_url": mp3.filename,
+            "duration": mp3.duration,
+            "bitrate": mp3.bitrate,
+            "size": mp3.size
         }
 
-        track = await self.track_repo.create_track(track_data)
-        return track
-
-    async def delete_track(self, title: str):
-        track = await self.track_repo.get_track_by_title(title)
+        # Проверка имени до загрузки только экономит трафик; гонку двух загрузок решает уникальный mp3_url
+        try:
+            track = await self.track_repo.create_track(track_data)
+        except IntegrityError:
+            await upload.discard()
+            raise HTTPException(409, detail=f"Track with file '{mp3.filename}' already exists")
+        except Exception:
+            await upload.discard()
+            raise
+
+        try:
+            await upload.commit()
+        except Exception:
+            await self.track_repo.delete_track(track.id)
+            await upload.discard()
+            raise
+
+        if self.meta_repo:
+            await self.meta_repo.save(track, duration=mp3.duration, bitrate=mp3.bitrate)
+        if self.catalog_repo:
+            await self.catalog_repo.track_added("media", mp3.filename, etag=mp3.etag, size=mp3.size)
+        if self.ingest_repo:
+            # Громкость и волна считаются вне запроса, в ingest_worker.py
+            await self.ingest_repo.enqueue(track.id, track.mp3_url)
+        return track, mp3
+
+    async def _check_new_file(self, field_name: str, filename: str):
+        # Имя уже занято — отказываем до начала загрузки, не гоняя файл зря
+        if field_name == "mp3_file" and await self.track_repo.get_track_by_mp3_url(filename):
+            raise HTTPException(409, detail=f"Track with file '{filename}' already exists")
+
+    async def delete_track(self, track_id: int):
+        track = await self.track_repo.get_track_by_id(track_id)
         if not track:
             raise HTTPException(status_code=404, detail="Track not found")
 
         # Удаляем файлы из MinIO (добавляем префиксы при удалении)
         await self.minio_repo.delete_file(f"media/{track.mp3_url}")
-        if track.cover_url and not track.cover_url.startswith(('http://', 'https://')):
-            await self.minio_repo.delete_file(f"image/{track.cover_url}")
-
-        await self.track_repo.delete_track(title)
-        return {"status": "success", "deleted_title": title}
+        await self.track_repo.delete_track(track_id)
+
+        # Обложки хранятся по содержимому и общие у треков альбома — удаляем последнюю ссылку
+        cover_url = track.cover_url
+        if cover_url and not cover_url.startswith(('http://', 'https://')) \
+                and not await self.track_repo.cover_in_use(cover_url):
+            try:
+                await self.minio_repo.delete_file(f"image/{cover_url}")
+            except Exception as e:
+                print(f"Cover delete error {cover_url}: {e}")
+        if self.meta_repo:
+            await self.meta_repo.delete(track.mp3_url)
+        if self.catalog_repo:
+            await self.catalog_repo.track_removed("media", track.mp3_url)
+        return {"status": "success", "deleted_id": track_id, "deleted_title": track.title}
 
     async def get_all_tracks(self):
-        return await self.track_repo.get_all_tracks()
\ No newline at end of file
+        return await self.track_repo.get_all_tracks()
+
+    async def get_tracks_page(self, limit: int, cursor: Optional[str] = None, search: Optional[str] = None) -> TrackPage:
+        after = decode_cursor(cursor) if cursor else None
+        rows, has_more = await self.track_repo.get_tracks_page(limit, after, search)
+        items = [TrackSchema.model_validate(row) for row in rows]
+        next_cursor = encode_cursor(items[-1].title, items[-1].id) if has_more and items else None
+        return TrackPage(items=items, next_cursor=next_cursor)
+
+
+def encode_cursor(title: str, track_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([title, track_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        title, track_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(title), int(track_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def export_tracks_json(session_factory):
+    """Весь каталог JSON-массивом, пачками из курсора базы — без материализации всего списка"""
+    async with session_factory() as session:
+        yield b"["
+        first = True
+        async for row in TrackRepository(session).stream_all_tracks():
+            item = TrackSchema.model_validate(row).model_dump_json().encode()
+            yield item if first else b"," + item
+            first = False
+        yield b"]"
@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import os
+import queue
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from Core.mp3 import Mp3Scanner
+from Repositories.minio_repository import MinioRepository
+
+PIPE_QUEUE_SIZE = 8  # Сколько кусков тела запроса может ждать загрузчика в MinIO
+MAX_FIELD_SIZE = 64 * 1024
+# Файл льётся под временным ключом и переезжает на своё имя только после записи трека в базу —
+# откат удаляет лишь то, что залил этот запрос. Каталог плеера берёт только *.mp3, .part он не видит
+UPLOAD_TMP_PREFIX = "uploads/"
+
+# Поле формы -> (бакет, допустимые расширения)
+FILE_FIELDS = {
+    "mp3_file": ("media", (".mp3",)),
+    "cover_file": ("image", (".jpg", ".jpeg", ".png")),
+}
+FILE_ERRORS = {
+    "mp3_file": "Only MP3 files are allowed",
+    "cover_file": "Only JPG/PNG images are allowed",
+}
+
+
+class PipeReader:
+    """Файлоподобный объект для put_object: отдаёт потоку MinIO куски, которые кладёт event loop"""
+
+    def __init__(self, maxsize: int = PIPE_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize)
+        self._buffer = b""
+        self._eof = False
+        self._aborted = False
+
+    async def write(self, data: Optional[bytes], task: Optional[asyncio.Task] = None):
+        """Кладёт кусок для загрузчика; если загрузка task уже упала, бросает её ошибку, а не ждёт места"""
+        if task is not None and task.done():
+            self._raise_upload_error(task)
+        try:
+            self._queue.put_nowait(data)
+            return
+        except queue.Full:
+            pass
+
+        # Загрузчик не успевает — ждём в стороннем потоке, не блокируя event loop
+        put = asyncio.ensure_future(asyncio.to_thread(self._queue.put, data))
+        if task is None:
+            await put
+            return
+        await asyncio.wait((put, task), return_when=asyncio.FIRST_COMPLETED)
+        if put.done():
+            put.result()
+            return
+        # Очередь больше никто не читает: освобождаем её, чтобы поток с put вернулся
+        self.abort()
+        await put
+        self._raise_upload_error(task)
+
+    async def close(self, task: Optional[asyncio.Task] = None):
+        await self.write(None, task)
+
+    @staticmethod
+    def _raise_upload_error(task: asyncio.Task):
+        if task.cancelled():
+            raise OSError("Upload cancelled")
+        raise task.exception() or OSError("Upload finished before the file was sent")
+
+    def abort(self):
+        self._aborted = True
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._queue.put_nowait(None)
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._buffer and not self._eof:
+            chunk = self._queue.get()
+            if self._aborted:
+                raise OSError("Upload aborted")
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer = chunk
+
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+@dataclass
+class UploadedFile:
+    field_name: str
+    bucket: str
+    filename: str
+    reader: PipeReader
+    temp_key: str = field(default_factory=lambda: f"{UPLOAD_TMP_PREFIX}{uuid.uuid4().hex}.part")
+    task: Optional[asyncio.Task] = None
+    size: int = 0
+    sha256: Any = field(default_factory=hashlib.sha256)
+    scanner: Optional[Mp3Scanner] = None
+    etag: Optional[str] = None
+
+    @property
+    def checksum(self) -> str:
+        return self.sha256.hexdigest()
+
+    @property
+    def key(self) -> str:
+        """Ключ после commit: mp3 — под своим именем, обложка — по содержимому, чтобы не затереть чужую"""
+        if self.field_name == "cover_file":
+            return self.checksum + os.path.splitext(self.filename)[1].lower()
+        return self.filename
+
+    @property
+    def duration(self) -> Optional[float]:
+        return round(self.scanner.duration, 3) if self.scanner and self.scanner.frames else None
+
+    @property
+    def bitrate(self) -> Optional[int]:
+        return self.scanner.bitrate if self.scanner and self.scanner.frames else None
+
+
+class StreamingTrackUpload:
+    """Разбирает multipart-тело по мере прихода и сразу льёт файлы в MinIO, без временных файлов"""
+
+    def __init__(
+            self,
+            minio_repo: MinioRepository,
+            check_file: Optional[Callable[[str, str], Awaitable[None]]] = None
+    ):
+        self.minio_repo = minio_repo
+        self.check_file = check_file  # Проверка имени файла до начала заливки, может бросить HTTPException
+        self.fields: dict[str, str] = {}
+        self.files: dict[str, UploadedFile] = {}
+        self._events = []
+        self._header_field = b""
+        self._headers = {}
+
+    def _parser(self, request: Request) -> MultipartParser:
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(400, detail="Expected multipart/form-data")
+
+        callbacks = {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+        return MultipartParser(params[b"boundary"], callbacks)
+
+    # Колбэки парсера синхронные — копим события и разбираем их после каждого куска тела
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data, start, end):
+        self._header_field = bytes(data[start:end]).lower()
+
+    def _on_header_value(self, data, start, end):
+        self._headers[self._header_field] = self._headers.get(self._header_field, b"") + bytes(data[start:end])
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode()
+        filename = options.get(b"filename")
+        self._events.append(("begin", name, filename.decode() if filename is not None else None))
+
+    def _on_part_data(self, data, start, end):
+        self._events.append(("data", bytes(data[start:end])))
+
+    def _on_part_end(self):
+        self._events.append(("end",))
+
+    async def receive(self, request: Request):
+        parser = self._parser(request)
+        current = None  # (имя поля, UploadedFile или bytearray для обычного поля)
+
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                events, self._events = self._events, []
+                for event in events:
+                    if event[0] == "begin":
+                        current = (event[1], await self._begin_part(event[1], event[2]))
+                    elif event[0] == "data" and current and current[1] is not None:
+                        await self._part_data(current[1], event[1])
+                    elif event[0] == "end" and current:
+                        await self._end_part(*current)
+                        current = None
+            parser.finalize()
+
+            for uploaded in self.files.values():
+                await uploaded.task
+        except BaseException:
+            await self.discard()
+            raise
+
+    async def _begin_part(self, name: str, filename: Optional[str]):
+        if filename is None:
+            return bytearray()
+        # Браузер присылает пустую часть, если файл не выбран
+        if not filename:
+            return None
+        if name not in FILE_FIELDS:
+            raise HTTPException(400, detail=f"Unexpected file field '{name}'")
+
+        bucket, extensions = FILE_FIELDS[name]
+        if not filename.lower().endswith(extensions):
+            raise HTTPException(400, detail=FILE_ERRORS[name])
+        if self.check_file:
+            await self.check_file(name, filename)
+
+        uploaded = UploadedFile(name, bucket, filename, PipeReader())
+        if name == "mp3_file":
+            uploaded.scanner = Mp3Scanner()
+        uploaded.task = asyncio.create_task(
+            self.minio_repo.upload_stream(bucket, uploaded.temp_key, uploaded.reader)
+        )
+        self.files[name] = uploaded
+        return uploaded
+
+    async def _part_data(self, target, data: bytes):
+        if isinstance(target, bytearray):
+            if len(target) + len(data) > MAX_FIELD_SIZE:
+                raise HTTPException(413, detail="Form field is too large")
+            target += data
+            return
+
+        target.size += len(data)
+        target.sha256.update(data)
+        if target.scanner:
+            target.scanner.feed(data)
+        await target.reader.write(data, target.task)
+
+    async def _end_part(self, name: str, target):
+        if isinstance(target, bytearray):
+            self.fields[name] = target.decode()
+        elif target is not None:
+            await target.reader.close(target.task)
+
+    async def commit(self):
+        """Переносит залитые файлы с временных ключей на постоянные"""
+        for uploaded in self.files.values():
+            result = await self.minio_repo.move_object(uploaded.bucket, uploaded.temp_key, uploaded.key)
+            uploaded.etag = getattr(result, "etag", None)
+
+    async def discard(self):
+        """Откатывает загрузку: останавливает потоки в MinIO и удаляет временные объекты этого запроса"""
+        for uploaded in self.files.values():
+            uploaded.reader.abort()
+        for uploaded in self.files.values():
+            try:
+                await uploaded.task
+            except BaseException:
+                pass
+            try:
+                await self.minio_repo.delete_file(f"{uploaded.bucket}/{uploaded.temp_key}")
+            except Exception:
+                pass
@@ -0,0 +1,109 @@
+# Минимальный HTTP/1.1-клиент на asyncio-сокетах: тысячи SSE-подписчиков без сторонних библиотек
+import asyncio
+from typing import Optional
+
+
+class HttpError(Exception):
+    pass
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> tuple[int, dict]:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+def _request(path: str, host: str, headers: Optional[dict] = None) -> bytes:
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+class SseClient:
+    """Подписчик /track-updates: разбирает chunked-поток и отдаёт события по одному"""
+
+    def __init__(self, host: str, port: int, path: str = "/track-updates"):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._buffer = ""
+
+    async def connect(self, last_event_id: Optional[int] = None):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        headers = {"Accept": "text/event-stream"}
+        if last_event_id is not None:
+            headers["Last-Event-ID"] = str(last_event_id)
+        self.writer.write(_request(self.path, f"{self.host}:{self.port}", headers))
+        status, headers = await _read_headers(self.reader)
+        if status != 200:
+            raise HttpError(f"SSE status {status}")
+        if headers.get("transfer-encoding") != "chunked":
+            raise HttpError("Expected a chunked event stream")
+        # Первый кусок (retry:) сервер шлёт уже после подписки на рассылку — клиент готов
+        self._buffer += await self._read_chunk()
+
+    async def _read_chunk(self) -> str:
+        size = int((await self.reader.readline()).strip(), 16)
+        if size == 0:
+            raise EOFError("Event stream closed")
+        data = await self.reader.readexactly(size + 2)
+        return data[:-2].decode()
+
+    async def next_event(self) -> dict:
+        """Следующее событие как {поле: значение}; комментарии (: ping) и retry пропускаются"""
+        while True:
+            while "\n\n" not in self._buffer:
+                self._buffer += await self._read_chunk()
+            raw, self._buffer = self._buffer.split("\n\n", 1)
+            event = {}
+            for line in raw.split("\n"):
+                if line.startswith(":") or ":" not in line:
+                    continue
+                name, value = line.split(":", 1)
+                event[name] = value[1:] if value.startswith(" ") else value
+            if "data" in event:
+                return event
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+
+class KeepAliveClient:
+    """Одно keep-alive соединение для серии GET-запросов"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def get(self, path: str, headers: Optional[dict] = None) -> tuple[int, dict, bytes]:
+        self.writer.write(_request(path, f"{self.host}:{self.port}", headers))
+        status, response_headers = await _read_headers(self.reader)
+        length = int(response_headers.get("content-length", 0))
+        body = await self.reader.readexactly(length) if length else b""
+        return status, response_headers, body
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
@@ -0,0 +1,25 @@
+"""Запуск main:app для стенда с --fake-redis: python -m bench.fake_backend main:app [аргументы uvicorn]
+
+TCP-сервер fakeredis понимает только RESP2 и не отвечает на CLIENT SETINFO, а redis-py
+по умолчанию подключается по RESP3 и шлёт SETINFO — здесь клиенты Redis создаются без этого. Остальной код приложения не меняется.
+"""
+import functools
+
+import uvicorn
+from redis import asyncio as aioredis
+
+_from_url = aioredis.from_url
+
+
+@functools.wraps(_from_url)
+def from_url(url, **kwargs):
+    kwargs.setdefault("lib_name", None)
+    kwargs.setdefault("lib_version", None)
+    kwargs.setdefault("protocol", 2)
+    return _from_url(url, **kwargs)
+
+
+aioredis.from_url = from_url
+
+if __name__ == "__main__":
+    uvicorn.main()
@@ -0,0 +1,359 @@
+"""Нагрузочный стенд для слушательских эндпоинтов: python -m bench.listeners [--scenario sse|info|all]
+
+Поднимает main:app отдельным процессом uvicorn (один воркер), подключает тысячи SSE-подписчиков,
+публикует смены трека так же, как NowPlayingPublisher плеера, и гоняет /track-info
+keep-alive соединениями. Печатает перцентили задержки рассылки, запросы в секунду,
+память сервера на соединение и операции Redis в секунду.
+
+Redis — настоящий (--redis-url, по умолчанию отдельная база 15) или fakeredis в TCP-режиме
+(--fake-redis, нужен пакет fakeredis; операции Redis в секунду он не считает).
+Postgres не нужен: документ now playing содержит метаданные, и /track-info отвечает без базы.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+from redis import asyncio as aioredis
+
+from bench.client import KeepAliveClient, SseClient
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = "127.0.0.1"
+
+
+def percentiles(values: list[float], points=(50, 90, 99)) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {f"p{point}": ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))] for point in points}
+    result["max"] = ordered[-1]
+    return result
+
+
+def format_ms(stats: dict) -> str:
+    return ", ".join(f"{name} {value * 1000:.1f} ms" for name, value in stats.items()) or "n/a"
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def raise_fd_limit():
+    # Каждый подписчик — два дескриптора в сумме на клиенте и сервере
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_redis() -> str:
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        sys.exit("--fake-redis needs the fakeredis package: pip install fakeredis")
+    port = free_port()
+    server = TcpFakeServer((HOST, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://{HOST}:{port}/0"
+
+
+class Backend:
+    """main:app в отдельном процессе — его память и CPU не смешиваются с клиентами стенда"""
+
+    def __init__(self, redis_url: str, port: int, fake_redis: bool = False):
+        self.redis_url = redis_url
+        self.port = port
+        self.fake_redis = fake_redis
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    async def start(self):
+        env = dict(os.environ, REDIS_URL=self.redis_url)
+        for name in ("DB_HOST", "DB_PORT", "DB_NAME", "DB_USER", "DB_PASS"):
+            env.setdefault(name, "localhost" if name == "DB_HOST" else "5432" if name == "DB_PORT" else "bench")
+        launcher = "bench.fake_backend" if self.fake_redis else "uvicorn"
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", launcher, "main:app", "--host", HOST, "--port", str(self.port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("Backend exited during startup")
+            try:
+                client = KeepAliveClient(HOST, self.port)
+                await client.connect()
+                await client.get("/track-info")
+                await client.close()
+                return
+            except OSError:
+                await asyncio.sleep(0.2)
+        raise RuntimeError("Backend did not start in 30 s")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class RedisOps:
+    """Сколько команд обработал Redis за интервал — по INFO stats, если сервер его отдаёт"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._start = None
+        self._started_at = 0.0
+
+    async def _total(self) -> Optional[int]:
+        if self.redis is None:
+            return None
+        try:
+            return int((await self.redis.info("stats"))["total_commands_processed"])
+        except Exception:
+            return None
+
+    async def start(self):
+        self._start = await self._total()
+        self._started_at = time.perf_counter()
+
+    async def rate(self) -> Optional[float]:
+        end = await self._total()
+        if self._start is None or end is None:
+            return None
+        # Минус наш собственный INFO
+        return (end - self._start - 1) / (time.perf_counter() - self._started_at)
+
+
+async def publish_track(redis, seq: int, namespace: str = "") -> dict:
+    """Как NowPlayingPublisher._publish: SET now_playing, SET last_track, PUBLISH — одним пайплайном.
+
+    У плеера started_at — время выхода первого RTP-пакета трека, здесь — момент публикации,
+    поэтому по нему же считается задержка рассылки.
+    """
+    key = f"bench-{seq}.mp3"
+    now_playing = {
+        "key": key,
+        "artist": "Bench Artist",
+        "title": f"Bench Track {seq}",
+        "cover_url": "",
+        "duration": 180.0,
+        "started_at": time.time(),
+        "rtp_timestamp": seq * 48000 * 180 % 2 ** 32,
+        "rtp_seq": seq * 9000 % 2 ** 16,
+        "ssrc": 11111111,
+        "seq": seq,
+    }
+    payload = json.dumps(now_playing, ensure_ascii=False)
+    pipe = redis.pipeline(transaction=False)
+    pipe.set(f"{namespace}now_playing", payload)
+    pipe.set(f"{namespace}last_track", key)
+    pipe.publish(f"{namespace}track_updates", payload)
+    await pipe.execute()
+    return now_playing
+
+
+async def sse_benchmark(args, backend: Backend, redis) -> dict:
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+    clients: list[SseClient] = []
+    failed = 0
+
+    async def connect():
+        nonlocal failed
+        client = SseClient(HOST, backend.port)
+        async with semaphore:
+            try:
+                await client.connect()
+                clients.append(client)
+            except (OSError, EOFError, asyncio.IncompleteReadError, ValueError) as e:
+                failed += 1
+                if failed <= 3:
+                    print(f"SSE connect error: {e!r}")
+                await client.close()
+
+    rss_before = rss_bytes(backend.pid)
+    started = time.perf_counter()
+    await asyncio.gather(*(connect() for _ in range(args.subscribers)))
+    connect_time = time.perf_counter() - started
+    await asyncio.sleep(0.5)
+    rss_after = rss_bytes(backend.pid)
+    print(f"SSE: {len(clients)} subscribers connected in {connect_time:.2f} s, {failed} failed")
+
+    latencies: list[float] = []
+    per_event: dict[int, float] = {}  # seq -> задержка самого медленного подписчика
+
+    async def listen(client: SseClient):
+        for _ in range(args.events):
+            event = await client.next_event()
+            received = time.time()
+            data = json.loads(event["data"])
+            latency = received - data["started_at"]
+            latencies.append(latency)
+            per_event[data["seq"]] = max(per_event.get(data["seq"], 0.0), latency)
+
+    # fakeredis не знает INFO и рвёт соединение — там счётчик не снимаем
+    ops = RedisOps(None if args.fake_redis else redis)
+    await ops.start()
+    listeners = [asyncio.create_task(listen(client)) for client in clients]
+    for seq in range(1, args.events + 1):
+        await publish_track(redis, seq)
+        await asyncio.sleep(args.interval)
+
+    _, pending = await asyncio.wait(listeners, timeout=args.drain_timeout)
+    for task in pending:
+        task.cancel()
+    redis_rate = await ops.rate()
+    await asyncio.gather(*(client.close() for client in clients))
+
+    expected = len(clients) * args.events
+    return {
+        "subscribers": len(clients),
+        "connect_failed": failed,
+        "connect_seconds": round(connect_time, 3),
+        "events": args.events,
+        "delivered": len(latencies),
+        "expected": expected,
+        "latency": percentiles(latencies),
+        "fanout_complete": percentiles(list(per_event.values())),
+        "rss_per_connection": (
+            (rss_after - rss_before) / len(clients) if clients and rss_before and rss_after else None
+        ),
+        "redis_ops_per_second": redis_rate,
+    }
+
+
+async def track_info_benchmark(args, backend: Backend, redis) -> dict:
+    await publish_track(redis, 10_000)
+    await asyncio.sleep(0.2)
+
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    deadline = time.perf_counter() + args.info_duration
+
+    async def worker():
+        client = KeepAliveClient(HOST, backend.port)
+        await client.connect()
+        headers = {}
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status, response_headers, _ = await client.get("/track-info", headers)
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+                if args.revalidate and "etag" in response_headers:
+                    # Как браузер с кэшем: дальше только условные запросы и 304
+                    headers = {"If-None-Match": response_headers["etag"]}
+        finally:
+            await client.close()
+
+    # fakeredis не знает INFO и рвёт соединение — там счётчик не снимаем
+    ops = RedisOps(None if args.fake_redis else redis)
+    await ops.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.info_connections)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "connections": args.info_connections,
+        "requests": len(latencies),
+        "requests_per_second": len(latencies) / elapsed,
+        "statuses": statuses,
+        "latency": percentiles(latencies),
+        "redis_ops_per_second": await ops.rate(),
+    }
+
+
+def print_report(report: dict):
+    if "sse" in report:
+        sse = report["sse"]
+        print(f"\n/track-updates: {sse['subscribers']} subscribers, {sse['events']} track changes")
+        print(f"  delivered {sse['delivered']}/{sse['expected']}")
+        print(f"  per-subscriber latency: {format_ms(sse['latency'])}")
+        print(f"  full fan-out per change: {format_ms(sse['fanout_complete'])}")
+        if sse["rss_per_connection"] is not None:
+            print(f"  server memory per connection: {sse['rss_per_connection'] / 1024:.1f} KiB")
+        if sse["redis_ops_per_second"] is not None:
+            print(f"  redis: {sse['redis_ops_per_second']:.1f} ops/s")
+    if "info" in report:
+        info = report["info"]
+        print(f"\n/track-info: {info['connections']} keep-alive connections")
+        print(f"  {info['requests_per_second']:.0f} req/s ({info['requests']} requests, statuses {info['statuses']})")
+        print(f"  latency: {format_ms(info['latency'])}")
+        if info["redis_ops_per_second"] is not None:
+            print(f"  redis: {info['redis_ops_per_second']:.1f} ops/s")
+
+
+async def main(args):
+    limit = raise_fd_limit()
+    if args.subscribers * 2 + 100 > limit:
+        print(f"Warning: open files limit {limit} may be too low for {args.subscribers} subscribers")
+
+    if args.fake_redis:
+        redis_url = start_fake_redis()
+        redis = aioredis.from_url(redis_url, decode_responses=True, lib_name=None, lib_version=None, protocol=2)
+    else:
+        redis_url = args.redis_url
+        redis = aioredis.from_url(redis_url, decode_responses=True)
+    backend = Backend(redis_url, args.port or free_port(), args.fake_redis)
+    await backend.start()
+
+    report = {}
+    try:
+        if args.scenario in ("sse", "all"):
+            report["sse"] = await sse_benchmark(args, backend, redis)
+        if args.scenario in ("info", "all"):
+            report["info"] = await track_info_benchmark(args, backend, redis)
+    finally:
+        backend.stop()
+        await redis.aclose()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for /track-updates and /track-info")
+    parser.add_argument("--scenario", choices=("sse", "info", "all"), default="all")
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=20, help="track changes to publish")
+    parser.add_argument("--interval", type=float, default=0.25, help="seconds between track changes")
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--drain-timeout", type=float, default=10)
+    parser.add_argument("--info-connections", type=int, default=50)
+    parser.add_argument("--info-duration", type=float, default=10)
+    parser.add_argument("--revalidate", action="store_true", help="send If-None-Match like a caching browser")
+    parser.add_argument("--redis-url", default=os.getenv("BENCH_REDIS_URL", "redis://localhost:6379/15"))
+    parser.add_argument("--fake-redis", action="store_true", help="use an in-process fakeredis TCP server")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    asyncio.run(main(parser.parse_args()))
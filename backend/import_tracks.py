@@ -0,0 +1,55 @@
+"""Массовый импорт треков из локальной папки: python import_tracks.py /path/to/music
+
+Берёт все *.mp3 рекурсивно, исполнителя, название и обложку — из ID3
+(или из manifest.json в корне папки), заливает в MinIO и пишет в базу одной транзакцией.
+"""
+import argparse
+import asyncio
+import os
+
+from redis import asyncio as aioredis
+
+from DataBase.session import async_session, engine
+from Repositories.catalog_repository import CatalogEventRepository
+from Repositories.ingest_queue_repository import IngestQueueRepository
+from Repositories.minio_repository import MinioRepository
+from Repositories.track_meta_repository import TrackMetaRepository
+from Repositories.track_repository import TrackRepository
+from Services.track_import_service import IMPORT_CONCURRENCY, TrackImportService, directory_sources
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+
+async def main(directory: str, concurrency: int):
+    sources = directory_sources(directory)
+    print(f"Found {len(sources)} mp3 files in {directory}")
+
+    minio_repo = MinioRepository()
+    await minio_repo.init()
+    redis = await aioredis.from_url(REDIS_URL, decode_responses=True)
+    try:
+        async with async_session() as session:
+            service = TrackImportService(
+                TrackRepository(session),
+                minio_repo,
+                TrackMetaRepository(redis),
+                CatalogEventRepository(redis),
+                IngestQueueRepository(redis),
+                concurrency=concurrency
+            )
+            report = await service.import_sources(sources)
+    finally:
+        await redis.close()
+        await engine.dispose()
+
+    print(f"Imported: {report.imported}, failed: {len(report.failed)}")
+    for failure in report.failed:
+        print(f"  {failure.file}: {failure.error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import of mp3 files into the radio catalog")
+    parser.add_argument("directory")
+    parser.add_argument("--concurrency", type=int, default=IMPORT_CONCURRENCY)
+    args = parser.parse_args()
+    asyncio.run(main(args.directory, args.concurrency))
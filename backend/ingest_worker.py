@@ -0,0 +1,93 @@
+"""Воркер анализа аудио: python ingest_worker.py [--backfill] [--sync-meta]
+
+Разбирает очередь ingest_queue в Redis: декодирует трек ffmpeg'ом, считает длительность,
+битрейт, громкость EBU R128, поправку ReplayGain и волну, режет миниатюры обложки
+и пишет всё в track_info и track_meta.
+Запускается одним процессом; параллельность — INGEST_CONCURRENCY заданий внутри него.
+--sync-meta один раз заполняет track_meta для треков, загруженных до появления метаданных в Redis.
+"""
+import argparse
+import asyncio
+import os
+
+from redis import asyncio as aioredis
+
+from DataBase.session import async_session, dispose_engines
+from Repositories.ingest_queue_repository import IngestQueueRepository
+from Repositories.minio_repository import MinioRepository
+from Repositories.track_meta_repository import TrackMetaRepository
+from Repositories.track_repository import TrackRepository
+from Services.ingest_service import IngestService
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 2))
+INGEST_POLL_TIMEOUT = float(os.getenv("INGEST_POLL_TIMEOUT", 5))
+META_SYNC_BATCH = 1000
+
+
+async def worker(name: str, queue: IngestQueueRepository, service: IngestService):
+    while True:
+        raw_job = await queue.take(INGEST_POLL_TIMEOUT)
+        if raw_job is None:
+            continue
+        try:
+            fields = await service.process(raw_job)
+            if "peak" in fields:
+                print(f"[{name}] {raw_job}: {fields['duration']}s, {fields['loudness']} LUFS, gain {fields['gain']} dB")
+            if fields.get("covers"):
+                print(f"[{name}] {raw_job}: {len(fields['covers'])} cover sizes")
+        except Exception as e:
+            # Битый файл не должен крутиться в очереди вечно — запускайте --backfill после исправления
+            print(f"[{name}] Ingest error {raw_job}: {e}")
+        finally:
+            await queue.done(raw_job)
+
+
+async def sync_meta(meta_repo: TrackMetaRepository) -> int:
+    """Весь каталог в track_meta пачками из курсора базы — без загрузки всей таблицы в память"""
+    synced, batch = 0, []
+    async with async_session() as session:
+        async for row in TrackRepository(session).stream_all_tracks():
+            batch.append(row)
+            if len(batch) >= META_SYNC_BATCH:
+                await meta_repo.sync(batch, extra_fields=("duration", "covers"))
+                synced, batch = synced + len(batch), []
+    if batch:
+        await meta_repo.sync(batch, extra_fields=("duration", "covers"))
+        synced += len(batch)
+    return synced
+
+
+async def main(backfill: bool, concurrency: int, meta: bool = False):
+    redis = await aioredis.from_url(REDIS_URL, decode_responses=True)
+    queue = IngestQueueRepository(redis)
+    meta_repo = TrackMetaRepository(redis)
+    service = IngestService(async_session, MinioRepository(), meta_repo)
+
+    try:
+        requeued = await queue.requeue_unfinished()
+        if requeued:
+            print(f"Requeued {requeued} unfinished jobs")
+
+        if meta:
+            print(f"Track meta: synced {await sync_meta(meta_repo)} tracks")
+
+        if backfill:
+            async with async_session() as session:
+                tracks = await TrackRepository(session).get_unanalyzed_tracks()
+            await queue.enqueue_many(tracks)
+            print(f"Backfill: queued {len(tracks)} tracks")
+
+        await asyncio.gather(*(worker(f"ingest-{i}", queue, service) for i in range(concurrency)))
+    finally:
+        await redis.close()
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audio analysis and cover thumbnail worker for uploaded tracks")
+    parser.add_argument("--backfill", action="store_true", help="queue every track that has not been analysed yet")
+    parser.add_argument("--sync-meta", action="store_true", help="write track_meta for every track in the database")
+    parser.add_argument("--concurrency", type=int, default=INGEST_CONCURRENCY)
+    args = parser.parse_args()
+    asyncio.run(main(args.backfill, args.concurrency, args.sync_meta))
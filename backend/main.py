@@ -116,13 +116,17 @@
 
 
 from fastapi import FastAPI
+from prometheus_client import REGISTRY
 from redis import asyncio as aioredis
-from sqlalchemy.ext.asyncio import async_sessionmaker
 from starlette.middleware.cors import CORSMiddleware
 import os
 
-from DataBase.session import engine
-from Routers import track_router, tracks
+from Core.metrics import SSE_CONNECTIONS, MetricsMiddleware, PoolCollector, instrument_redis
+from DataBase.session import async_session, dispose_engines, pool_stats
+from Repositories.minio_repository import MinioRepository
+from Routers import metrics_router, track_router, tracks
+from Services.now_playing_cache import NowPlayingCache
+from Services.track_broadcaster import TrackBroadcaster
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 
@@ -133,6 +137,7 @@ app = FastAPI(title="Radio", version="1.0.0", docs_url="/setdocs", redoc_url=Non
 
 app.include_router(track_router.router)
 app.include_router(tracks.router)
+app.include_router(metrics_router.router)
 
 app.root_path = "/api"
 
@@ -143,16 +148,35 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Снаружи CORS: время считается и для ответов, которые middleware CORS отдаёт сам
+app.add_middleware(MetricsMiddleware)
+
+REGISTRY.register(PoolCollector(pool_stats))
+
+async def init_minio():
+    """Клиент MinIO создаётся один раз; бакеты и политика проверяются при старте, а не в каждом запросе.
+    Не получилось — повторит первый запрос, которому нужен MinIO (get_minio_repository)"""
+    app.state.minio_repo = MinioRepository()
+    try:
+        await app.state.minio_repo.init()
+    except Exception as e:
+        print(f"MinIO initialization error: {e}")
 
 @app.on_event("startup")
 async def startup():
-    app.state.redis = await aioredis.from_url(REDIS_URL, decode_responses=True)
-    app.state.async_session = async_sessionmaker(engine, expire_on_commit=False)
+    app.state.redis = instrument_redis(await aioredis.from_url(REDIS_URL, decode_responses=True))
+    app.state.async_session = async_session
+    app.state.track_broadcaster = TrackBroadcaster(app.state.redis)
+    await app.state.track_broadcaster.start()
+    SSE_CONNECTIONS.set_function(lambda: app.state.track_broadcaster.subscriber_count)
+    app.state.now_playing_cache = NowPlayingCache(app.state.redis)
+    await init_minio()
     print("Redis and DB initialized successfully")
 
 @app.on_event("shutdown")
 async def shutdown():
+    if hasattr(app.state, 'track_broadcaster'):
+        await app.state.track_broadcaster.stop()
     if hasattr(app.state, 'redis'):
         await app.state.redis.close()
-    if hasattr(app.state, 'engine'):
-        await app.state.engine.dispose()
+    await dispose_engines()
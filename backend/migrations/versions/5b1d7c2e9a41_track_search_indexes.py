@@ -0,0 +1,33 @@
+"""Track search indexes
+
+Revision ID: 5b1d7c2e9a41
+Revises: e3972ad4625a
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1d7c2e9a41'
+down_revision: Union[str, Sequence[str], None] = 'e3972ad4625a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_track_info_title_trgm', 'track_info', ['title'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index('ix_track_info_artist_trgm', 'track_info', ['artist'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'artist': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_track_info_artist_trgm', table_name='track_info')
+    op.drop_index('ix_track_info_title_trgm', table_name='track_info')
@@ -0,0 +1,47 @@
+"""Track surrogate key
+
+Revision ID: 8c4f2a9d1e73
+Revises: 5b1d7c2e9a41
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4f2a9d1e73'
+down_revision: Union[str, Sequence[str], None] = '5b1d7c2e9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SERIAL сам заполнит id для уже существующих строк
+    op.execute('ALTER TABLE track_info ADD COLUMN id SERIAL')
+    op.drop_constraint('track_info_pkey', 'track_info', type_='primary')
+    op.create_primary_key('track_info_pkey', 'track_info', ['id'])
+
+    op.add_column('track_info', sa.Column('duration', sa.Float(), nullable=True))
+    op.add_column('track_info', sa.Column('bitrate', sa.Integer(), nullable=True))
+    op.add_column('track_info', sa.Column('size', sa.BigInteger(), nullable=True))
+
+    op.create_index('ix_track_info_mp3_url', 'track_info', ['mp3_url'], unique=True)
+    op.create_index('ix_track_info_title_id', 'track_info', ['title', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_track_info_title_id', table_name='track_info')
+    op.drop_index('ix_track_info_mp3_url', table_name='track_info')
+
+    op.drop_column('track_info', 'size')
+    op.drop_column('track_info', 'bitrate')
+    op.drop_column('track_info', 'duration')
+
+    op.drop_constraint('track_info_pkey', 'track_info', type_='primary')
+    op.create_primary_key('track_info_pkey', 'track_info', ['title'])
+    op.drop_column('track_info', 'id')
@@ -0,0 +1,34 @@
+"""Track audio analysis
+
+Revision ID: b7e15d3a6c28
+Revises: 8c4f2a9d1e73
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e15d3a6c28'
+down_revision: Union[str, Sequence[str], None] = '8c4f2a9d1e73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('track_info', sa.Column('loudness', sa.Float(), nullable=True))
+    op.add_column('track_info', sa.Column('peak', sa.Float(), nullable=True))
+    op.add_column('track_info', sa.Column('gain', sa.Float(), nullable=True))
+    op.add_column('track_info', sa.Column('waveform', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('track_info', 'waveform')
+    op.drop_column('track_info', 'gain')
+    op.drop_column('track_info', 'peak')
+    op.drop_column('track_info', 'loudness')
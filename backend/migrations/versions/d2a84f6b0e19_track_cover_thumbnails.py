@@ -0,0 +1,28 @@
+"""Track cover thumbnails
+
+Revision ID: d2a84f6b0e19
+Revises: b7e15d3a6c28
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a84f6b0e19'
+down_revision: Union[str, Sequence[str], None] = 'b7e15d3a6c28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('track_info', sa.Column('covers', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('track_info', 'covers')
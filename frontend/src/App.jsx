@@ -7,6 +7,19 @@ import RadioPlayer from './components/RadioPlayer';
 import './styles/App.css';
 
 
+const imageUrl = (key) => `${import.meta.env.VITE_MINIO_URL}/image/${key}`;
+
+// Миниатюры обложки ({размер: {формат: ключ}}) -> srcset для каждого формата
+const coverSources = (covers) => {
+  if (!covers) return null;
+  const srcSet = (format) =>
+    Object.entries(covers)
+      .filter(([, variants]) => variants[format])
+      .map(([size, variants]) => `${imageUrl(variants[format])} ${size}w`)
+      .join(', ');
+  return { avif: srcSet('avif'), webp: srcSet('webp') };
+};
+
 function App() {
   const [showWelcome, setShowWelcome] = useState(true);
 
@@ -20,9 +33,10 @@ function App() {
                 playStream={playStream}
                 albumCover={
                     trackInfo?.cover_url 
-                      ? `${import.meta.env.VITE_MINIO_URL}/image/${trackInfo.cover_url}`
+                      ? imageUrl(trackInfo.cover_url)
                       : "default.jpg"
                   }
+                albumCoverSources={coverSources(trackInfo?.covers)}
                 artistName={trackInfo?.artist || "Unknown Artist"}
                 trackName={trackInfo?.title || "Unknown Track"}
               />
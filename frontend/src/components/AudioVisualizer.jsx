@@ -1,7 +1,7 @@
 import React, { useEffect, useRef, useState } from "react";
 import "../styles/AudioVisualizer.css";
 
-const AudioVisualizer = ({ playStream, albumCover, artistName, trackName }) => {
+const AudioVisualizer = ({ playStream, albumCover, albumCoverSources, artistName, trackName }) => {
   const canvasRef = useRef(null);
   const audioRef = useRef(null);
   const contextRef = useRef(null);
@@ -273,7 +273,12 @@ const AudioVisualizer = ({ playStream, albumCover, artistName, trackName }) => {
       <div class="album-container">
       <div className="album-cover">
         {albumCover ? (
-          <img src={albumCover} alt="Album cover" className="album-image" />
+          <picture>
+            {/* Браузер берёт лёгкую миниатюру нужного размера, оригинал — только запасной вариант */}
+            {albumCoverSources?.avif && <source type="image/avif" srcSet={albumCoverSources.avif} sizes="200px" />}
+            {albumCoverSources?.webp && <source type="image/webp" srcSet={albumCoverSources.webp} sizes="200px" />}
+            <img src={albumCover} alt="Album cover" className="album-image" />
+          </picture>
         ) : (
           <div className="album-placeholder">
             <div className="music-icon">♪</div>
@@ -0,0 +1,206 @@
+import bisect
+import os
+import threading
+import time
+
+from metrics import log_event
+
+CATALOG_STREAM = os.getenv('CATALOG_STREAM', 'catalog_events')
+CATALOG_RESCAN_INTERVAL = float(os.getenv('CATALOG_RESCAN_INTERVAL', 3600))
+CATALOG_BLOCK_MS = int(os.getenv('CATALOG_BLOCK_MS', 5000))
+# Снимок каталога в Redis: после рестарта плеер стартует с него, а листинг бакета идёт в фоне
+CATALOG_SNAPSHOT_PREFIX = os.getenv('CATALOG_SNAPSHOT_PREFIX', 'catalog_snapshot:')
+CATALOG_SNAPSHOT_BATCH = 10000
+
+
+def _stream_id(message_id):
+    ms, _, seq = message_id.partition('-')
+    return int(ms), int(seq or 0)
+
+
+class TrackCatalog:
+    """Треки станции в памяти: отсортированные ключи плюс индекс ключ -> (ETag, размер).
+
+    Полный листинг бакета делается один раз при старте (и изредка для страховки),
+    дальше каталог обновляется по событиям из Redis-стрима, который пишет API загрузки.
+    """
+
+    def __init__(self, s3, bucket_name, prefix=''):
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self._keys = []
+        self._objects = {}
+        self._lock = threading.Lock()
+        self.redis = None
+        self._watch_args = (CATALOG_STREAM, '$', False)
+        # Подписчики на изменения каталога: объекты с track_added(key) и track_removed(key)
+        self.listeners = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._objects
+
+    def keys(self):
+        with self._lock:
+            return list(self._keys)
+
+    def _notify(self, added=(), removed=()):
+        for listener in self.listeners:
+            for key in added:
+                listener.track_added(key)
+            for key in removed:
+                listener.track_removed(key)
+
+    def _accepts(self, bucket, key):
+        return bucket == self.bucket_name and key.startswith(self.prefix) and key.endswith('.mp3')
+
+    def scan(self, stream_id=None):
+        objects = {}
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=self.prefix):
+            for obj in page.get('Contents', []):
+                if obj['Key'].endswith('.mp3'):
+                    objects[obj['Key']] = (obj.get('ETag'), obj.get('Size', 0))
+
+        with self._lock:
+            previous = self._objects
+            self._objects = objects
+            self._keys = sorted(objects)
+        log_event('catalog_scan', bucket=self.bucket_name, prefix=self.prefix, tracks=len(objects))
+        if stream_id:
+            self._save_snapshot(objects, stream_id)
+        # Пересканирование ловит то, что прошло мимо стрима событий
+        self._notify(
+            added=[key for key in objects if key not in previous],
+            removed=[key for key in previous if key not in objects]
+        )
+
+    def get(self, key):
+        return self._objects.get(key, (None, 0))
+
+    def add(self, key, etag, size):
+        with self._lock:
+            is_new = key not in self._objects
+            if is_new:
+                bisect.insort(self._keys, key)
+            self._objects[key] = (etag, size)
+        if is_new:
+            self._notify(added=[key])
+
+    def remove(self, key):
+        with self._lock:
+            if self._objects.pop(key, None) is None:
+                return
+            index = bisect.bisect_left(self._keys, key)
+            if index < len(self._keys) and self._keys[index] == key:
+                del self._keys[index]
+        self._notify(removed=[key])
+
+    def apply(self, event):
+        bucket = event.get('bucket', self.bucket_name)
+        key = event.get('key', '')
+        if not self._accepts(bucket, key):
+            return
+
+        if event.get('event') == 'delete':
+            self.remove(key)
+            log_event('catalog_removed', bucket=self.bucket_name, key=key)
+            return
+
+        etag, size = event.get('etag'), event.get('size')
+        if not etag or not size:
+            head = self.s3.head_object(Bucket=self.bucket_name, Key=key)
+            etag, size = head.get('ETag'), head.get('ContentLength', 0)
+        self.add(key, etag, int(size))
+        log_event('catalog_added', bucket=self.bucket_name, key=key, size=size)
+
+    def _snapshot_key(self):
+        return f"{CATALOG_SNAPSHOT_PREFIX}{self.bucket_name}/{self.prefix}"
+
+    def _save_snapshot(self, objects, stream_id):
+        key = self._snapshot_key()
+        mapping = {k: f"{size} {etag or ''}" for k, (etag, size) in objects.items()}
+        items = list(mapping.items())
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(key)
+            for start in range(0, len(items), CATALOG_SNAPSHOT_BATCH):
+                pipe.hset(key, mapping=dict(items[start:start + CATALOG_SNAPSHOT_BATCH]))
+            pipe.set(f"{key}:stream_id", stream_id)
+            pipe.execute()
+        except Exception as e:
+            log_event('catalog_snapshot_error', bucket=self.bucket_name, prefix=self.prefix, error=e)
+
+    def _load_snapshot(self, stream):
+        """Каталог из снимка и позиция стрима, с которой его догонять; None — снимка нет или он устарел"""
+        key = self._snapshot_key()
+        try:
+            stream_id = self.redis.get(f"{key}:stream_id")
+            if not stream_id:
+                return None
+            # Стрим обрезается по длине: если нужные события уже вытеснены, снимку верить нельзя
+            oldest = self.redis.xrange(stream, count=1)
+            if oldest and stream_id != '0-0' and _stream_id(oldest[0][0]) > _stream_id(stream_id):
+                return None
+            snapshot = self.redis.hgetall(key)
+        except Exception as e:
+            log_event('catalog_snapshot_error', bucket=self.bucket_name, prefix=self.prefix, error=e)
+            return None
+
+        objects = {}
+        for k, value in snapshot.items():
+            size, _, etag = value.partition(' ')
+            objects[k] = (etag or None, int(size))
+        with self._lock:
+            self._objects = objects
+            self._keys = sorted(objects)
+        log_event(
+            'catalog_snapshot', bucket=self.bucket_name, prefix=self.prefix, tracks=len(objects),
+            stream_id=stream_id
+        )
+        return stream_id
+
+    def _stream_position(self, stream):
+        try:
+            latest = self.redis.xrevrange(stream, count=1)
+            return latest[0][0] if latest else '0-0'
+        except Exception as e:
+            log_event('catalog_stream_error', stream=stream, error=e)
+            return None
+
+    def load(self, redis_client, stream=CATALOG_STREAM):
+        """Каталог из снимка (листинг бакета — в фоне, после watch) или первичный листинг"""
+        self.redis = redis_client
+        last_id = self._load_snapshot(stream)
+        from_snapshot = last_id is not None
+        if not from_snapshot:
+            # Позицию стрима запоминаем до листинга, чтобы не потерять загрузки между ними
+            last_id = self._stream_position(stream)
+            self.scan(last_id)
+        self._watch_args = (stream, last_id or '$', from_snapshot)
+
+    def watch(self):
+        """Подписка на события с позиции, на которой остановился load(); слушателей добавляют до неё —
+        иначе изменения между load() и подпиской не дойдут до них"""
+        threading.Thread(target=self._watch, args=self._watch_args, daemon=True).start()
+
+    def _watch(self, stream, last_id, rescan_now=False):
+        redis_client = self.redis
+        last_scan = float('-inf') if rescan_now else time.monotonic()
+        while True:
+            try:
+                if time.monotonic() - last_scan > CATALOG_RESCAN_INTERVAL:
+                    self.scan(self._stream_position(stream))
+                    last_scan = time.monotonic()
+
+                response = redis_client.xread({stream: last_id}, block=CATALOG_BLOCK_MS, count=100)
+                for _, messages in response or []:
+                    for message_id, fields in messages:
+                        last_id = message_id
+                        self.apply(fields)
+            except Exception as e:
+                log_event('catalog_watch_error', stream=stream, error=e)
+                time.sleep(1)
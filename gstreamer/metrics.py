@@ -0,0 +1,188 @@
+import json
+import os
+import time
+
+from prometheus_client import REGISTRY, Counter, Histogram, start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+PLAYER_METRICS_PORT = int(os.getenv('PLAYER_METRICS_PORT', 9101))  # 0 — не поднимать /metrics
+# logfmt (ключ=значение) или json — одна строка на событие
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'logfmt')
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+PUSH_RESULTS = Counter(
+    'radio_push_buffers', 'push-buffer calls by flow return', ['station', 'flow']
+)
+UNDERRUNS = Counter(
+    'radio_underruns', 'appsrc ran dry while the feeder thread was busy', ['station']
+)
+UNDERRUN_SECONDS = Counter(
+    'radio_underrun_seconds', 'Time appsrc waited for data after running dry', ['station']
+)
+TRACKS_STARTED = Counter('radio_tracks_started', 'Tracks started', ['station', 'source'])
+TRACK_ERRORS = Counter('radio_track_errors', 'Tracks aborted by an error', ['station'])
+TRACK_TRANSITION = Histogram(
+    'radio_track_transition_seconds',
+    'Feeder gap between the last buffer of a track and the first buffer of the next',
+    ['station'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+FETCH_SECONDS = Histogram(
+    'radio_track_fetch_seconds', 'Time blocked on object storage per fetched object', ['station', 'source'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+FETCH_THROUGHPUT = Histogram(
+    'radio_track_fetch_throughput_bytes_per_second', 'Object storage throughput per fetched object',
+    ['station', 'source'],
+    buckets=tuple(2 ** power * 1024 for power in range(6, 18))  # 64 KiB/s .. 128 MiB/s
+)
+FETCH_BYTES = Counter('radio_fetch_bytes', 'Bytes read from object storage', ['station', 'source'])
+FETCH_RETRIES = Counter('radio_fetch_retries', 'Object storage reads resumed after an error', ['station'])
+FIRST_BYTE = Histogram(
+    'radio_s3_first_byte_seconds', 'GetObject time to response headers', ['station'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+RTP_PACKETS = Counter('radio_rtp_packets', 'RTP packets handed to udpsink', ['station'])
+RTP_BYTES = Counter('radio_rtp_bytes', 'RTP payload bytes handed to udpsink', ['station'])
+
+
+def thread_cpu_seconds(tid):
+    """CPU-время одного потока процесса по /proc; None, если поток неизвестен"""
+    if not tid:
+        return None
+    try:
+        with open(f"/proc/self/task/{tid}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    # После имени потока: state — поле 3, utime и stime — поля 14 и 15
+    return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+
+
+class StationCollector:
+    """Значения, которые читаются в момент опроса: уровень очереди appsrc и CPU потока конвейера"""
+
+    def __init__(self):
+        self.sources = {}  # станция -> функция, возвращающая stream_stats()
+
+    def collect(self):
+        level_bytes = GaugeMetricFamily(
+            'radio_appsrc_level_bytes', 'Bytes queued in appsrc', labels=['station']
+        )
+        level_seconds = GaugeMetricFamily(
+            'radio_appsrc_level_seconds', 'Audio queued in appsrc (timestamped Opus playout only)',
+            labels=['station']
+        )
+        cpu = CounterMetricFamily(
+            'radio_streaming_thread_cpu_seconds',
+            'CPU time of the pipeline streaming thread (decode, encode, payload)', labels=['station']
+        )
+        for station, stats in list(self.sources.items()):
+            try:
+                values = stats()
+            except Exception:
+                continue
+            if values.get('level_bytes') is not None:
+                level_bytes.add_metric([station], values['level_bytes'])
+            if values.get('level_seconds') is not None:
+                level_seconds.add_metric([station], values['level_seconds'])
+            if values.get('streaming_cpu') is not None:
+                cpu.add_metric([station], values['streaming_cpu'])
+        yield level_bytes
+        yield level_seconds
+        yield cpu
+
+
+_collector = StationCollector()
+REGISTRY.register(_collector)
+
+
+def start_metrics_server(port=PLAYER_METRICS_PORT):
+    if port:
+        start_http_server(port)
+        log_event('metrics_server', port=port)
+
+
+def _logfmt(value):
+    value = '' if value is None else str(value)
+    if not value or any(c in value for c in ' ="\\'):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def log_event(event, **fields):
+    record = {'ts': round(time.time(), 3), 'event': event, **fields}
+    if LOG_FORMAT == 'json':
+        line = json.dumps(record, ensure_ascii=False, default=str)
+    else:
+        line = ' '.join(f"{name}={_logfmt(value)}" for name, value in record.items())
+    print(line, flush=True)
+
+
+class FetchTimer:
+    """Считает время, проведённое в ожидании хранилища, и байты одного объекта"""
+
+    def __init__(self, station, source):
+        self.station = station
+        self.source = source
+        self.seconds = 0.0
+        self.bytes = 0
+
+    def chunks(self, iterable):
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.seconds += time.perf_counter() - started
+            self.bytes += len(chunk)
+            yield chunk
+
+    def first_byte(self, seconds):
+        self.seconds += seconds
+        FIRST_BYTE.labels(self.station).observe(seconds)
+
+    def observe(self, key):
+        if not self.bytes:
+            return  # Объекта нет (например, ещё не перекодированный Opus) — это не загрузка
+        FETCH_SECONDS.labels(self.station, self.source).observe(self.seconds)
+        FETCH_BYTES.labels(self.station, self.source).inc(self.bytes)
+        throughput = self.bytes / self.seconds if self.seconds > 0 else None
+        if throughput:
+            FETCH_THROUGHPUT.labels(self.station, self.source).observe(throughput)
+        log_event(
+            'fetch', station=self.station, source=self.source, key=key, bytes=self.bytes,
+            seconds=round(self.seconds, 3), throughput=int(throughput) if throughput else None
+        )
+
+
+class PlayerMetrics:
+    """Метрики одной станции: дочерние счётчики с уже подставленной меткой"""
+
+    def __init__(self, station, stream_stats):
+        self.station = station
+        self.underruns = UNDERRUNS.labels(station)
+        self.underrun_seconds = UNDERRUN_SECONDS.labels(station)
+        self.track_errors = TRACK_ERRORS.labels(station)
+        self.track_transition = TRACK_TRANSITION.labels(station)
+        self.fetch_retries = FETCH_RETRIES.labels(station)
+        self.rtp_packets = RTP_PACKETS.labels(station)
+        self.rtp_bytes = RTP_BYTES.labels(station)
+        self._push_results = {}
+        _collector.sources[station] = stream_stats
+
+    def push_result(self, flow):
+        counter = self._push_results.get(flow)
+        if counter is None:
+            counter = self._push_results[flow] = PUSH_RESULTS.labels(self.station, flow)
+        counter.inc()
+
+    def track_started(self, source):
+        TRACKS_STARTED.labels(self.station, source).inc()
+
+    def fetch_timer(self, source):
+        return FetchTimer(self.station, source)
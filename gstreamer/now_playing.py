@@ -0,0 +1,83 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from metrics import log_event
+
+NOW_PLAYING_QUEUE_SIZE = int(os.getenv('NOW_PLAYING_QUEUE_SIZE', 16))
+
+
+class NowPlayingPublisher:
+    """Публикует смену трека в Redis из своего потока.
+
+    Поток конвейера, увидевший первый RTP-пакет нового трека, только кладёт событие в очередь,
+    так что медленный Redis не задерживает звук. Если Redis недоступен долго и очередь
+    переполнилась, новые события отбрасываются — слушатели догонят на следующем треке.
+    """
+
+    def __init__(self, redis_client, redis_namespace='', name='', ssrc=None):
+        self.redis = redis_client
+        self.redis_namespace = redis_namespace
+        self.name = name
+        self.ssrc = ssrc
+        self.seq = 0
+        self._queue = queue.Queue(maxsize=NOW_PLAYING_QUEUE_SIZE)
+        threading.Thread(target=self._run, name=f"now-playing-{name}", daemon=True).start()
+
+    def submit(self, key, started_at, position=0.0, rtp_timestamp=None, rtp_seq=None):
+        try:
+            self._queue.put_nowait((key, started_at, position, rtp_timestamp, rtp_seq))
+        except queue.Full:
+            log_event('now_playing_dropped', station=self.name, key=key)
+
+    def _redis_key(self, name):
+        return f"{self.redis_namespace}{name}"
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._publish(*job)
+            except Exception as e:
+                log_event('redis_error', station=self.name, error=e)
+
+    def _resolve(self, key, started_at, rtp_timestamp, rtp_seq):
+        # Метаданные кладёт бэкенд при загрузке трека (track_meta:<ключ mp3>)
+        meta = self.redis.hgetall(f"track_meta:{key}")
+        self.seq = self.redis.incr(self._redis_key("now_playing_seq"))
+        duration = meta.get("duration")
+        gain = meta.get("gain")
+        return {
+            "key": key,
+            "artist": meta.get("artist"),
+            "title": meta.get("title"),
+            "cover_url": meta.get("cover_url"),
+            "duration": float(duration) if duration else None,
+            # Посчитаны ingest-воркером: поправка громкости и волна для фронтенда
+            "gain": float(gain) if gain else None,
+            "waveform": meta.get("waveform"),
+            "covers": json.loads(meta["covers"]) if meta.get("covers") else None,
+            # Время выхода первого пакета трека в эфир; при возобновлении — начало трека в прошлом
+            "started_at": started_at,
+            # RTP-время и номер первого пакета трека: клиент может переключить метаданные ровно на нём
+            "rtp_timestamp": rtp_timestamp,
+            "rtp_seq": rtp_seq,
+            "ssrc": self.ssrc,
+            "seq": self.seq,
+        }
+
+    def _publish(self, key, started_at, position, rtp_timestamp, rtp_seq):
+        now_playing = self._resolve(key, started_at, rtp_timestamp, rtp_seq)
+        payload = json.dumps(now_playing, ensure_ascii=False)
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.set(self._redis_key("now_playing"), payload)
+        pipe.set(self._redis_key("last_track"), key)
+        pipe.publish(self._redis_key("track_updates"), payload)
+        pipe.execute()
+        log_event(
+            'now_playing', station=self.name, key=key, seq=self.seq, position=round(position, 1),
+            rtp_timestamp=rtp_timestamp, delay=round(time.time() - started_at - position, 3)
+        )
@@ -0,0 +1,72 @@
+import mmap
+import os
+import struct
+
+from gi.repository import Gst
+
+# Файл пакетов: сигнатура, затем для каждого Opus-пакета (размер, длительность в нс) и сами байты
+PACKET_MAGIC = b"OPKT1\n"
+PACKET_HEADER = struct.Struct(">IQ")
+
+OPUS_CAPS = "audio/x-opus,channel-mapping-family=0,channels=2,rate=48000"
+
+
+def transcode_to_packets(src_path, dst_path, bitrate):
+    """Один раз декодирует mp3 и кодирует в Opus, складывая готовые пакеты в файл"""
+    pipeline = Gst.parse_launch(
+        "filesrc name=src "
+        " ! decodebin "
+        " ! audioconvert "
+        " ! audioresample "
+        " ! audio/x-raw,rate=48000,channels=2 "
+        f" ! opusenc bitrate={bitrate} "
+        " ! appsink name=sink sync=false"
+    )
+    pipeline.get_by_name("src").set_property("location", src_path)
+    sink = pipeline.get_by_name("sink")
+
+    tmp_path = f"{dst_path}.part"
+    pipeline.set_state(Gst.State.PLAYING)
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(PACKET_MAGIC)
+            while True:
+                sample = sink.emit("try-pull-sample", Gst.SECOND)
+                if sample is None:
+                    error = pipeline.get_bus().pop_filtered(Gst.MessageType.ERROR)
+                    if error:
+                        err, debug = error.parse_error()
+                        raise RuntimeError(f"Transcode failed: {err.message}")
+                    if sink.get_property("eos"):
+                        break
+                    continue
+                buf = sample.get_buffer()
+                ok, info = buf.map(Gst.MapFlags.READ)
+                if not ok:
+                    continue
+                try:
+                    out.write(PACKET_HEADER.pack(info.size, buf.duration))
+                    out.write(info.data)
+                finally:
+                    buf.unmap(info)
+
+        os.replace(tmp_path, dst_path)
+    finally:
+        pipeline.set_state(Gst.State.NULL)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_packets(path):
+    """Отдаёт (пакет, длительность в нс) из файла пакетов"""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(PACKET_MAGIC)] != PACKET_MAGIC:
+                raise ValueError(f"Not an Opus packet file: {path}")
+            offset = len(PACKET_MAGIC)
+            end = len(mm)
+            while offset + PACKET_HEADER.size <= end:
+                size, duration = PACKET_HEADER.unpack_from(mm, offset)
+                offset += PACKET_HEADER.size
+                yield mm[offset:offset + size], duration
+                offset += size
@@ -2,141 +2,574 @@ import gi
 gi.require_version('Gst', '1.0')
 from gi.repository import Gst, GLib, GObject
 import threading
+import functools
 import boto3
-import io
+from botocore.exceptions import BotoCoreError, ClientError
+from urllib3.exceptions import HTTPError as URLLib3HTTPError
+import json
 import redis
 import os
+import struct
+import tempfile
 import time
 from dotenv import load_dotenv
 
+from catalog import TrackCatalog
+from metrics import PlayerMetrics, log_event, start_metrics_server, thread_cpu_seconds
+from now_playing import NowPlayingPublisher
+from opus_cache import OPUS_CAPS, read_packets, transcode_to_packets
+from scheduler import PlayoutScheduler
+from track_cache import Prefetcher, TrackCache
+
 load_dotenv()
 
 Gst.init(None)
 
+S3_READ_CHUNK_SIZE = int(os.getenv('S3_READ_CHUNK_SIZE', 64 * 1024))
+S3_READ_RETRIES = int(os.getenv('S3_READ_RETRIES', 5))
+S3_RETRY_DELAY = float(os.getenv('S3_RETRY_DELAY', 1))
+
+PUSH_CHUNK_SIZE = int(os.getenv('PUSH_CHUNK_SIZE', 256 * 1024))
+APPSRC_MAX_BYTES = int(os.getenv('APPSRC_MAX_BYTES', 1024 * 1024))
+# need-data приходит, когда очередь appsrc опустилась ниже этой доли, а не когда она уже пуста
+APPSRC_MIN_PERCENT = int(os.getenv('APPSRC_MIN_PERCENT', 50))
+
+TRACK_CACHE_DIR = os.getenv('TRACK_CACHE_DIR', '/tmp/track-cache')
+TRACK_CACHE_MAX_BYTES = int(os.getenv('TRACK_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+PREFETCH_DEPTH = int(os.getenv('PREFETCH_DEPTH', 2))
+PREFETCH_MAX_BYTES = int(os.getenv('PREFETCH_MAX_BYTES', 256 * 1024 ** 2))
+
+# transcode — mp3 декодируется и кодируется в Opus на каждом проигрывании;
+# opus — трек один раз перекодируется в файл Opus-пакетов, который дальше идёт прямо в rtpopuspay
+PLAYOUT_MODE = os.getenv('PLAYOUT_MODE', 'transcode')
+OPUS_BITRATE = int(os.getenv('OPUS_BITRATE', 128000))
+OPUS_S3_PREFIX = os.getenv('OPUS_S3_PREFIX', 'opus/')
+
+# Позиция эфира в Redis: после падения или редеплоя плеер продолжает тот же трек с того же места
+PLAYOUT_CHECKPOINT_INTERVAL = float(os.getenv('PLAYOUT_CHECKPOINT_INTERVAL', 5))
+PLAYOUT_RESUME_MAX_AGE = float(os.getenv('PLAYOUT_RESUME_MAX_AGE', 900))
+
+# Зависший Redis не должен держать поток подачи вечно; больше, чем блокирующий XREAD каталога
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 10))
+
+# Метка начала трека: идёт по конвейеру вместе с буферами и ловится перед udpsink
+TRACK_START_EVENT = 'radio-track-start'
+
+
+def make_redis():
+    return redis.Redis(
+        host=os.getenv('REDIS_HOST', 'redis'),
+        port=int(os.getenv('REDIS_PORT', 6379)),
+        db=0,
+        decode_responses=True,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT
+    )
+
+
+def make_s3(endpoint_url, access_key, secret_key):
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint_url,
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+    )
+
+
+def make_cache():
+    if PLAYOUT_MODE == 'opus':
+        return TrackCache(os.path.join(TRACK_CACHE_DIR, 'opus'), TRACK_CACHE_MAX_BYTES)
+    return TrackCache(TRACK_CACHE_DIR, TRACK_CACHE_MAX_BYTES)
+
 
 class S3RTPPlayer:
-    def __init__(self, bucket_name, dest_ip, dest_port, endpoint_url, access_key, secret_key):
+    def __init__(self, bucket_name, dest_ip, dest_port, endpoint_url=None, access_key=None, secret_key=None,
+                 s3=None, redis_client=None, loop=None, cache=None,
+                 ssrc=11111111, prefix='', redis_namespace='', name=None):
         self.bucket_name = bucket_name
         self.dest_ip = dest_ip
         self.dest_port = dest_port
+        self.ssrc = ssrc
+        self.prefix = prefix
+        # Ключи и канал станции в Redis: "<namespace>now_playing", "<namespace>track_updates" и т.д.
+        self.redis_namespace = redis_namespace
+        self.name = name or bucket_name
         self.appsrc = None
         self.pipeline = None
-        self.loop = GLib.MainLoop()
+        self.loop = loop or GLib.MainLoop()
         self.pushing = True
+        self.need_data = threading.Event()
+        self.opus_playout = PLAYOUT_MODE == 'opus'
+        self.running_time = 0
+        self.playing = None  # Что сейчас подаётся в appsrc — для контрольной точки
+        # Поток подачи ждёт места в appsrc; если очередь опустела, пока он занят чтением, — это провал звука
+        self.waiting_for_room = False
+        self.fed = False
+        self.starved_at = None
+        self.streaming_tid = None  # Поток конвейера, который отдаёт RTP в udpsink
+        self.track_start = None  # Метка нового трека, дошедшая до udpsink раньше его первого пакета
+        self.metrics = PlayerMetrics(self.name, self.stream_stats)
 
-        self.redis = redis.Redis(
-            host=os.getenv('REDIS_HOST', 'redis'),
-            port=int(os.getenv('REDIS_PORT', 6379)),
-            db=0
-        )
+        self.redis = redis_client or make_redis()
         self.redis_channel = os.getenv('REDIS_CHANNEL', 'current_track')
+        # Смена трека публикуется, когда его первый пакет уходит в сеть, и из своего потока
+        self.now_playing = NowPlayingPublisher(self.redis, redis_namespace, self.name, ssrc)
 
-        self.s3 = boto3.client(
-            's3',
-            endpoint_url=endpoint_url,
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-        )
+        self.s3 = s3 or make_s3(endpoint_url, access_key, secret_key)
+
+        self.catalog = TrackCatalog(self.s3, bucket_name, prefix)
+        self.catalog.load(self.redis)
+        self.current_key = None
+
+        # Порядок эфира считается заранее и хранится в Redis — рестарт и загрузки его не сбрасывают
+        self.scheduler = PlayoutScheduler(self.catalog, self.redis, redis_namespace)
+        self.scheduler.load()
+        # Слушатель — до запуска слежения за стримом: ни одно изменение каталога не пройдёт мимо пула
+        self.catalog.listeners.append(self.scheduler)
+        self.catalog.watch()
+
+        self.cache = cache or make_cache()
+        fetch = self._fetch_opus if self.opus_playout else self._stream_track
+        self.prefetcher = Prefetcher(self.cache, functools.partial(fetch, source='prefetch'), PREFETCH_MAX_BYTES)
+
+    def _stream_track(self, key, offset=0, source='playout'):
+        """Читает объект кусками по мере прихода; при обрыве докачивает с того же места"""
+        log_event('fetch_start', station=self.name, source=source, key=key, offset=offset)
+        timer = self.metrics.fetch_timer(source)
+        try:
+            yield from self._read_object(key, offset, timer)
+        finally:
+            timer.observe(key)
+
+    def _read_object(self, key, offset, timer):
+        etag = None
+        retries = 0
+
+        while True:
+            params = {'Bucket': self.bucket_name, 'Key': key}
+            if offset:
+                params['Range'] = f"bytes={offset}-"
+            if etag:
+                # Если объект подменили во время проигрывания, не склеиваем разные файлы
+                params['IfMatch'] = etag
+
+            try:
+                started = time.perf_counter()
+                response = self.s3.get_object(**params)
+                timer.first_byte(time.perf_counter() - started)
+                etag = response.get('ETag', etag)
+                body = response['Body']
+                try:
+                    for chunk in timer.chunks(body.iter_chunks(S3_READ_CHUNK_SIZE)):
+                        offset += len(chunk)
+                        retries = 0
+                        yield chunk
+                finally:
+                    body.close()
+                return
+            except ClientError as e:
+                code = e.response.get('Error', {}).get('Code')
+                if code in ('PreconditionFailed', 'InvalidRange', 'NoSuchKey', '412', '416', '404'):
+                    raise
+                error = e
+            except (BotoCoreError, URLLib3HTTPError, OSError) as e:
+                error = e
+
+            retries += 1
+            if retries > S3_READ_RETRIES:
+                raise error
+            self.metrics.fetch_retries.inc()
+            log_event('fetch_retry', station=self.name, key=key, offset=offset, retry=retries, error=error)
+            time.sleep(S3_RETRY_DELAY * retries)
+
+    def _schedule_prefetch(self):
+        self.prefetcher.schedule(self.scheduler.upcoming(PREFETCH_DEPTH))
+
+    def _open_track(self, key, offset=0):
+        etag, _ = self.catalog.get(key)
+        path = self.cache.get(key, etag) or self.prefetcher.wait(key, etag)
+        if path:
+            self.metrics.track_started('cache')
+            return self._read_file(path, offset)
+        self.metrics.track_started('s3')
+        if offset:
+            # Хвост файла в кэш не кладём — там только целые треки
+            return self._stream_track(key, offset)
+        return self.cache.tee(key, etag, self._stream_track(key))
+
+    def _opus_key(self, key):
+        etag, _ = self.catalog.get(key)
+        etag = (etag or "").strip('"')
+        suffix = f".{etag}" if etag else ""
+        return f"{OPUS_S3_PREFIX}{key}{suffix}.opk"
+
+    def _fetch_opus(self, key, source='playout'):
+        """Файл Opus-пакетов: готовый из S3 или перекодированный здесь и выложенный в S3 для остальных"""
+        opus_key = self._opus_key(key)
+        try:
+            yield from self._stream_track(opus_key, source=source)
+            return
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                raise
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_path = os.path.join(tmp_dir, 'source.mp3')
+            dst_path = os.path.join(tmp_dir, 'track.opk')
+            with open(src_path, 'wb') as f:
+                for chunk in self._stream_track(key, source=source):
+                    f.write(chunk)
+
+            started = time.perf_counter()
+            transcode_to_packets(src_path, dst_path, OPUS_BITRATE)
+            log_event('transcode', station=self.name, key=key, seconds=round(time.perf_counter() - started, 3))
+            try:
+                self.s3.upload_file(dst_path, self.bucket_name, opus_key)
+            except Exception as e:
+                log_event('opus_upload_error', station=self.name, key=opus_key, error=e)
+
+            yield from self._read_file(dst_path)
+
+    def _open_opus_track(self, key):
+        etag, _ = self.catalog.get(key)
+        path = self.cache.get(key, etag) or self.prefetcher.wait(key, etag)
+        self.metrics.track_started('cache' if path else 's3')
+        if not path:
+            path = self.cache.store(key, etag, self._fetch_opus(key))
+        if not path:
+            raise RuntimeError(f"Opus packets for {key} are not available")
+        return path
+
+    def _pipeline_running_time(self):
+        clock = self.pipeline.get_clock()
+        if not clock:
+            return 0
+        return max(0, clock.get_time() - self.pipeline.get_base_time())
+
+    def _track_buffers(self, key, offset=0, position=0.0):
+        playing = self.playing
+        if not self.opus_playout:
+            # mp3 продолжаем с байтового смещения: парсер decodebin сам найдёт начало кадра
+            for data in self._open_track(key, offset):
+                playing['pushed'] += len(data)
+                yield Gst.Buffer.new_wrapped(data)
+            return
+
+        # Пакеты уже закодированы — расставляем им время сами, не отставая от часов конвейера
+        self.running_time = max(self.running_time, self._pipeline_running_time())
+        skip = int(position * Gst.SECOND)
+        for packet, duration in read_packets(self._open_opus_track(key)):
+            if skip > 0:
+                skip -= duration
+                continue
+            if playing['first_pts'] is None:
+                playing['first_pts'] = self.running_time
+            buf = Gst.Buffer.new_wrapped(packet)
+            buf.pts = self.running_time
+            buf.duration = duration
+            self.running_time += duration
+            yield buf
 
-        self.tracks = self._list_mp3_files()
-        self.last_track_list_hash = self._hash_track_list(self.tracks)
-        self.track_idx = 0
-
-    def _list_mp3_files(self):
-        response = self.s3.list_objects_v2(Bucket=self.bucket_name)
-        if 'Contents' not in response:
-            return []
-        return sorted([obj['Key'] for obj in response['Contents'] if obj['Key'].endswith('.mp3')])
-
-    def _hash_track_list(self, track_list):
-        return hash(tuple(track_list))
-
-    def _refresh_track_list_if_changed(self):
-        new_tracks = self._list_mp3_files()
-        new_hash = self._hash_track_list(new_tracks)
-        if new_hash != self.last_track_list_hash:
-            print("Track list changed, refreshing.")
-            self.tracks = new_tracks
-            self.last_track_list_hash = new_hash
-            self.track_idx = 0
+    @staticmethod
+    def _read_file(path, start=0):
+        # Файл из кэша читаем крупными кусками: Gst.Buffer.new_wrapped всё равно копирует bytes,
+        # так что mmap ничего бы не сэкономил
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while True:
+                chunk = f.read(PUSH_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    def _redis_key(self, name):
+        return f"{self.redis_namespace}{name}"
+
+    def _checkpoint(self):
+        """Что слушатели слышат сейчас: ключ, байтовое смещение (mp3) и позиция в секундах"""
+        playing = self.playing
+        if not playing:
+            return None
+        if self.opus_playout:
+            first_pts = playing['first_pts']
+            elapsed = (self._pipeline_running_time() - first_pts) / Gst.SECOND if first_pts is not None else 0
+            position = playing['position'] + max(0.0, elapsed)
+            offset = 0
         else:
-            print("Track list unchanged, looping.")
+            # Отправленное минус то, что ещё лежит в очереди appsrc
+            queued = self.appsrc.get_property('current-level-bytes') if self.appsrc else 0
+            offset = max(playing['offset'], playing['offset'] + playing['pushed'] - queued)
+            # Время считаем от выхода первого RTP-пакета трека, а не от начала подачи: до этого
+            # слушатели ещё дослушивают то, что лежит в очереди appsrc
+            aired_at = playing['aired_at']
+            elapsed = time.time() - aired_at if aired_at is not None else 0.0
+            position = playing['position'] + max(0.0, elapsed)
+        return {
+            "key": playing['key'],
+            "etag": playing['etag'],
+            "mode": PLAYOUT_MODE,
+            "offset": offset,
+            "position": round(position, 3),
+            "saved_at": time.time(),
+        }
+
+    def save_checkpoint(self):
+        checkpoint = self._checkpoint()
+        if not checkpoint:
+            return
+        try:
+            self.redis.set(self._redis_key("playout_checkpoint"), json.dumps(checkpoint))
+        except Exception as e:
+            log_event('checkpoint_error', station=self.name, error=e)
 
-    def _download_track(self, key):
-        print(f"Downloading: {key}")
-        response = self.s3.get_object(Bucket=self.bucket_name, Key=key)
-        return io.BytesIO(response['Body'].read())
+    def _on_checkpoint_timer(self):
+        self.save_checkpoint()
+        return self.pushing
 
-    def _publish_current_track(self, track_name):
+    def _on_checkpoint_idle(self):
+        self.save_checkpoint()
+        return False
+
+    def _load_checkpoint(self):
+        """Контрольная точка, если с неё ещё можно продолжить: свежая, тот же файл и режим эфира"""
         try:
-            self.redis.publish("track_updates", track_name)
-            self.redis.set("last_track", track_name)
-            print(f"Published to Redis: {track_name}")
+            raw = self.redis.get(self._redis_key("playout_checkpoint"))
+            checkpoint = json.loads(raw) if raw else None
         except Exception as e:
-            print(f"Redis error: {e}")
+            log_event('checkpoint_error', station=self.name, error=e)
+            return None
+        if not checkpoint or time.time() - checkpoint.get('saved_at', 0) > PLAYOUT_RESUME_MAX_AGE:
+            return None
+        key = checkpoint.get('key')
+        etag, size = self.catalog.get(key)
+        if key not in self.catalog or etag != checkpoint.get('etag') or checkpoint.get('mode') != PLAYOUT_MODE:
+            return None
+        if size and checkpoint.get('offset', 0) >= size:
+            return None
+        return checkpoint
 
-    def start(self):
-        pipeline_str = (
-            "appsrc name=src is-live=true format=time "
-            " ! decodebin "
-            " ! audioconvert "
-            " ! audioresample "
-            " ! opusenc "
-            " ! rtpopuspay pt=111 ssrc=11111111 "
-            " ! udpsink host={} port={}"
-        ).format(self.dest_ip, self.dest_port)
+    def setup(self):
+        """Собирает конвейер и запускает поток подачи; главный цикл GLib крутит вызывающий"""
+        if self.opus_playout:
+            pipeline_str = (
+                "appsrc name=src is-live=true format=time "
+                " ! rtpopuspay pt=111 ssrc={} "
+                " ! udpsink name=rtp host={} port={}"
+            ).format(self.ssrc, self.dest_ip, self.dest_port)
+        else:
+            pipeline_str = (
+                "appsrc name=src is-live=true format=time "
+                " ! decodebin "
+                " ! audioconvert "
+                " ! audioresample "
+                " ! opusenc "
+                " ! rtpopuspay pt=111 ssrc={} "
+                " ! udpsink name=rtp host={} port={}"
+            ).format(self.ssrc, self.dest_ip, self.dest_port)
 
         self.pipeline = Gst.parse_launch(pipeline_str)
         self.appsrc = self.pipeline.get_by_name("src")
         self.appsrc.set_property("format", Gst.Format.TIME)
-        self.appsrc.set_property("block", True)
+        if self.opus_playout:
+            self.appsrc.set_property("caps", Gst.Caps.from_string(OPUS_CAPS))
+        # Вместо блокирующего push-buffer пишем, пока appsrc просит данные
+        self.appsrc.set_property("block", False)
+        self.appsrc.set_property("max-bytes", APPSRC_MAX_BYTES)
+        self.appsrc.set_property("min-percent", APPSRC_MIN_PERCENT)
+        self.appsrc.connect("need-data", self._on_need_data)
+        self.appsrc.connect("enough-data", self._on_enough_data)
+        self.pipeline.get_by_name("rtp").get_static_pad("sink").add_probe(
+            Gst.PadProbeType.BUFFER | Gst.PadProbeType.BUFFER_LIST | Gst.PadProbeType.EVENT_DOWNSTREAM,
+            self._on_rtp
+        )
 
         self.pipeline.set_state(Gst.State.PLAYING)
         threading.Thread(target=self.push_loop, daemon=True).start()
+        GLib.timeout_add(int(PLAYOUT_CHECKPOINT_INTERVAL * 1000), self._on_checkpoint_timer)
+
+    def start(self):
+        self.setup()
         self.loop.run()
 
+    def _on_need_data(self, src, length):
+        # appsrc просит данные, когда очередь ниже min-percent; если она уже пуста, а поток подачи
+        # в этот момент не ждёт места, а читает трек, — данных нет, и эфир проваливается
+        if self.fed and not self.waiting_for_room and self.starved_at is None \
+                and src.get_property('current-level-bytes') == 0:
+            self.starved_at = time.monotonic()
+        self.need_data.set()
+
+    def _on_enough_data(self, src):
+        self.need_data.clear()
+
+    def _on_rtp(self, pad, info):
+        # Вызывается в потоке конвейера — заодно запоминаем его, чтобы считать его CPU
+        if self.streaming_tid is None:
+            self.streaming_tid = threading.get_native_id()
+        if info.type & Gst.PadProbeType.EVENT_DOWNSTREAM:
+            self._on_rtp_event(info.get_event())
+            return Gst.PadProbeReturn.OK
+        if info.type & Gst.PadProbeType.BUFFER_LIST:
+            buffers = info.get_buffer_list()
+            self.metrics.rtp_packets.inc(buffers.length())
+            self.metrics.rtp_bytes.inc(buffers.calculate_size())
+            first = buffers.get(0) if buffers.length() else None
+        else:
+            first = info.get_buffer()
+            self.metrics.rtp_packets.inc()
+            self.metrics.rtp_bytes.inc(first.get_size())
+        if self.track_start is not None and first is not None:
+            self._on_track_on_air(pad, first)
+        return Gst.PadProbeReturn.OK
+
+    def _on_rtp_event(self, event):
+        if event.type != Gst.EventType.CUSTOM_DOWNSTREAM:
+            return
+        structure = event.get_structure()
+        if structure is None or structure.get_name() != TRACK_START_EVENT:
+            return
+        _, position = structure.get_double('position')
+        self.track_start = (structure.get_string('key'), position)
+
+    def _on_track_on_air(self, pad, buf):
+        """Первый RTP-пакет нового трека: только отметить время и отдать публикацию в очередь"""
+        key, position = self.track_start
+        self.track_start = None
+        rtp_timestamp = rtp_seq = None
+        ok, mapinfo = buf.map(Gst.MapFlags.READ)
+        if ok:
+            try:
+                if mapinfo.size >= 8:
+                    rtp_seq, rtp_timestamp = struct.unpack_from('>HI', mapinfo.data, 2)
+            finally:
+                buf.unmap(mapinfo)
+        aired_at = self._air_time(pad, buf)
+        playing = self.playing
+        if playing and playing['key'] == key and playing['aired_at'] is None:
+            playing['aired_at'] = aired_at
+        self.now_playing.submit(key, aired_at - position, position, rtp_timestamp, rtp_seq)
+
+    def _air_time(self, pad, buf):
+        # udpsink синхронизирован с часами: пакет уходит, когда часы конвейера дойдут до его running time
+        now = time.time()
+        if buf.pts == Gst.CLOCK_TIME_NONE:
+            return now
+        segment_event = pad.get_sticky_event(Gst.EventType.SEGMENT, 0)
+        if segment_event is None:
+            return now
+        running_time = segment_event.parse_segment().to_running_time(Gst.Format.TIME, buf.pts)
+        if running_time == Gst.CLOCK_TIME_NONE:
+            return now
+        return now + (running_time - self._pipeline_running_time()) / Gst.SECOND
+
+    def _mark_track_start(self, key, position):
+        # Сериализованное событие appsrc ставит в очередь между буферами — до udpsink оно дойдёт
+        # вплотную перед первым пакетом трека, после декодера и кодировщика
+        structure = Gst.Structure.new_empty(TRACK_START_EVENT)
+        structure.set_value('key', key)
+        structure.set_value('position', float(position))
+        event = Gst.Event.new_custom(Gst.EventType.CUSTOM_DOWNSTREAM, structure)
+        if not self.appsrc.send_event(event):
+            # Конвейер событие не принял — публикуем без привязки к RTP и отсчитываем позицию от подачи
+            self.playing['aired_at'] = time.time()
+            self.now_playing.submit(key, time.time() - position, position)
+
+    def stream_stats(self):
+        """Читается при опросе /metrics"""
+        if not self.appsrc:
+            return {}
+        stats = {
+            'level_bytes': self.appsrc.get_property('current-level-bytes'),
+            'streaming_cpu': thread_cpu_seconds(self.streaming_tid),
+        }
+        if self.opus_playout:
+            try:
+                stats['level_seconds'] = self.appsrc.get_property('current-level-time') / Gst.SECOND
+            except TypeError:
+                pass  # current-level-time появился в GStreamer 1.20
+        return stats
+
+    def _push(self, buf):
+        self.waiting_for_room = True
+        self.need_data.wait()
+        self.waiting_for_room = False
+        if not self.pushing:
+            return Gst.FlowReturn.FLUSHING
+
+        starved_at = self.starved_at
+        if starved_at is not None:
+            self.starved_at = None
+            stalled = time.monotonic() - starved_at
+            self.metrics.underruns.inc()
+            self.metrics.underrun_seconds.inc(stalled)
+            log_event('underrun', station=self.name, key=self.current_key, seconds=round(stalled, 3))
+
+        ret = self.appsrc.emit("push-buffer", buf)
+        self.fed = True
+        self.metrics.push_result(ret.value_nick)
+        return ret
+
     def push_loop(self):
+        # Трек из контрольной точки уже снят с очереди планировщика — играем его первым
+        resume = self._load_checkpoint()
+        last_buffer_at = None
         while self.pushing:
-            if not self.tracks:
-                print("Нет треков в бакете. Ожидание...")
+            offset, position = 0, 0.0
+            if resume:
+                current_key, offset, position = resume['key'], resume['offset'], resume['position']
+                log_event('resume', station=self.name, key=current_key, offset=offset, position=position)
+                resume = None
+            else:
+                current_key = self.scheduler.next()
+            if current_key is None:
+                log_event('catalog_empty', station=self.name)
                 time.sleep(5)
-                self._refresh_track_list_if_changed()
+                last_buffer_at = None
                 continue
 
-            if self.track_idx >= len(self.tracks):
-                self._refresh_track_list_if_changed()
-                self.track_idx = 0
-                continue
-
-            current_key = self.tracks[self.track_idx]
-            self._publish_current_track(current_key)
+            self.current_key = current_key
+            self.playing = {
+                'key': current_key,
+                'etag': self.catalog.get(current_key)[0],
+                'offset': offset,
+                'position': position,
+                'aired_at': None,  # Когда первый пакет трека ушёл в эфир — ставит проба на udpsink
+                'pushed': 0,
+                'first_pts': None,
+            }
+            # Redis трогаем из главного цикла, а не из потока подачи
+            GLib.idle_add(self._on_checkpoint_idle)
+            self._schedule_prefetch()
 
+            first = True
             try:
-                track_data = self._download_track(current_key)
-
-                while True:
-                    data = track_data.read(4096)
-                    if not data:
-                        break
-                    buf = Gst.Buffer.new_allocate(None, len(data), None)
-                    buf.fill(0, data)
-                    ret = self.appsrc.emit("push-buffer", buf)
+                for buf in self._track_buffers(current_key, offset, position):
+                    if first:
+                        self._mark_track_start(current_key, position)
+                    ret = self._push(buf)
                     if ret != Gst.FlowReturn.OK:
-                        print("Ошибка push-buffer:", ret)
+                        log_event('push_error', station=self.name, key=current_key, flow=ret.value_nick)
                         break  # НЕ self.pushing = False — просто пропустить этот трек
+                    if first:
+                        first = False
+                        # Сколько поток подачи шёл от конца прошлого трека до первого буфера этого
+                        if last_buffer_at is not None:
+                            self.metrics.track_transition.observe(time.monotonic() - last_buffer_at)
 
             except Exception as e:
-                print(f"Ошибка при проигрывании {current_key}: {e}")
-
-            self.track_idx += 1
+                self.metrics.track_errors.inc()
+                log_event('track_error', station=self.name, key=current_key, error=e)
+            last_buffer_at = time.monotonic()
 
         # Конец работы, завершаем поток
-        print("Завершение потока")
+        log_event('feeder_stopped', station=self.name)
         if self.appsrc:
             self.appsrc.emit("end-of-stream")
 
     def stop(self):
+        self.save_checkpoint()
         self.pushing = False
+        self.need_data.set()
         if self.appsrc:
             self.appsrc.emit("end-of-stream")
         if self.pipeline:
@@ -144,7 +577,54 @@ class S3RTPPlayer:
         self.loop.quit()
 
 
+def run_stations(config_path):
+    """Много станций в одном процессе: общий цикл GLib, S3-клиент, Redis и кэш треков"""
+    with open(config_path) as f:
+        config = json.load(f)
+
+    start_metrics_server()
+
+    s3 = make_s3(os.getenv("S3_ENDPOINT_URL"), os.getenv("S3_ACCESS_KEY"), os.getenv("S3_SECRET_KEY"))
+    redis_client = make_redis()
+    cache = make_cache()
+    loop = GLib.MainLoop()
+
+    players = []
+    for station in config["stations"]:
+        player = S3RTPPlayer(
+            bucket_name=station.get("bucket", os.getenv("S3_BUCKET_NAME")),
+            dest_ip=station.get("dest_ip", os.getenv("S3_DEST_IP")),
+            dest_port=int(station["dest_port"]),
+            s3=s3,
+            redis_client=redis_client,
+            loop=loop,
+            cache=cache,
+            ssrc=int(station["ssrc"]),
+            prefix=station.get("prefix", ""),
+            redis_namespace=station.get("redis_namespace", ""),
+            name=station.get("name")
+        )
+        player.setup()
+        players.append(player)
+        log_event(
+            'station', station=player.name, bucket=player.bucket_name, prefix=player.prefix,
+            dest=f"{player.dest_ip}:{player.dest_port}"
+        )
+
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        for player in players:
+            player.stop()
+
+
 if __name__ == "__main__":
+    if os.getenv("STATIONS_CONFIG"):
+        run_stations(os.getenv("STATIONS_CONFIG"))
+        raise SystemExit
+
+    start_metrics_server()
+
     player = S3RTPPlayer(
         bucket_name=os.getenv("S3_BUCKET_NAME"),
         dest_ip=os.getenv("S3_DEST_IP"),
@@ -0,0 +1,266 @@
+import os
+import queue
+import random
+import threading
+from collections import deque
+
+from metrics import log_event
+
+SCHEDULE_DEPTH = int(os.getenv('SCHEDULE_DEPTH', 20))
+# Сколько треков должно пройти между двумя песнями одного артиста и между повторами одного трека
+SCHEDULE_ARTIST_SEPARATION = int(os.getenv('SCHEDULE_ARTIST_SEPARATION', 3))
+SCHEDULE_TRACK_SEPARATION = int(os.getenv('SCHEDULE_TRACK_SEPARATION', 50))
+# Сколько кандидатов с хвоста пула смотрим, подбирая трек под правила
+SCHEDULE_WINDOW = int(os.getenv('SCHEDULE_WINDOW', 32))
+# Вес трека — сколько раз он звучит за цикл ротации: HSET schedule_weights <ключ mp3> 3
+SCHEDULE_WEIGHTS_KEY = os.getenv('SCHEDULE_WEIGHTS_KEY', 'schedule_weights')
+SCHEDULE_MAX_WEIGHT = int(os.getenv('SCHEDULE_MAX_WEIGHT', 10))
+SCHEDULE_WRITE_BATCH = 10000
+
+
+class PlayoutScheduler:
+    """Очередь ближайших треков станции, посчитанная заранее и сохранённая в Redis.
+
+    Цикл ротации — перемешанный пул всех треков (трек с весом N встречается N раз);
+    следующий трек берётся с хвоста пула с учётом разноса артистов и повторов,
+    так что выбор не зависит от размера библиотеки. <namespace>schedule:queue —
+    ближайшие SCHEDULE_DEPTH треков, их отдаёт бэкенд в /up-next и по ним работает префетчер.
+    Загрузки встают в пул на случайное место, удалённые треки выпадают из очереди сразу,
+    а из пула — когда до них дойдёт очередь.
+
+    next() вызывает поток подачи, поэтому Redis в нём не трогается: блокировка держится только
+    на время работы с памятью, а чтение артистов и весов, дополнение очереди и все записи
+    делает свой поток — записи в том же порядке, в каком менялось состояние.
+    """
+
+    def __init__(self, catalog, redis_client, redis_namespace='', depth=SCHEDULE_DEPTH):
+        self.catalog = catalog
+        self.redis = redis_client
+        self.depth = depth
+        self.namespace = redis_namespace
+        self.queue_key = f"{redis_namespace}schedule:queue"
+        self.pool_key = f"{redis_namespace}schedule:pool"
+        self._queue = deque()
+        self._pool = []  # Следующий кандидат — в конце: pop и swap с концом стоят O(1)
+        self._recent = deque(maxlen=max(SCHEDULE_ARTIST_SEPARATION, SCHEDULE_TRACK_SEPARATION, 1))
+        self._artists = {}
+        self._lock = threading.Lock()
+        self._jobs = queue.Queue()
+        threading.Thread(target=self._run, name=f"schedule-{redis_namespace}", daemon=True).start()
+
+    def load(self):
+        """Восстанавливает очередь и пул после рестарта; без них начинает новый цикл"""
+        try:
+            queue = self.redis.lrange(self.queue_key, 0, -1)
+            pool = self.redis.lrange(self.pool_key, 0, -1)
+        except Exception as e:
+            log_event('schedule_load_error', namespace=self.namespace, error=e)
+            queue, pool = [], []
+
+        with self._lock:
+            # Треки, удалённые пока плеер стоял, отбрасываем; новые войдут в следующий цикл
+            self._queue = deque(key for key in queue if key in self.catalog)
+            self._pool = pool
+            for key in self._queue:
+                self._recent.append(key)
+        self._refill()
+        log_event('schedule_loaded', namespace=self.namespace, queued=len(self._queue), pool=len(self._pool))
+
+    def next(self):
+        with self._lock:
+            key = self._queue.popleft() if self._queue else None
+        if key is None:
+            # Очередь пуста только при пустом каталоге или если фон не успевает — тут ждать приходится
+            self._refill()
+            with self._lock:
+                key = self._queue.popleft() if self._queue else None
+        self._jobs.put(self._refill)
+        return key
+
+    def upcoming(self, count):
+        """Ближайшие треки как (ключ, ETag, размер) — для префетчера"""
+        with self._lock:
+            keys = list(self._queue)[:count]
+        return [(key, *self.catalog.get(key)) for key in keys]
+
+    def track_added(self, key):
+        weight = self._weight(key)
+        with self._lock:
+            self._artists.pop(key, None)
+            pipe = self.redis.pipeline(transaction=False)
+            for _ in range(weight):
+                # Fisher–Yates для одного элемента: в конец и обмен со случайной позицией
+                self._pool.append(key)
+                index = random.randrange(len(self._pool))
+                self._pool[index], self._pool[-1] = self._pool[-1], self._pool[index]
+                pipe.rpush(self.pool_key, self._pool[-1])
+                pipe.lset(self.pool_key, index, self._pool[index])
+            self._execute(pipe)
+
+    def track_removed(self, key):
+        with self._lock:
+            self._artists.pop(key, None)
+            if key not in self._queue:
+                return
+            self._queue = deque(k for k in self._queue if k != key)
+        self._jobs.put(self._refill)
+
+    def _weight(self, key):
+        try:
+            weight = int(self.redis.hget(SCHEDULE_WEIGHTS_KEY, key) or 1)
+        except Exception:
+            weight = 1
+        return max(1, min(weight, SCHEDULE_MAX_WEIGHT))
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                job()
+            except Exception as e:
+                log_event('schedule_error', namespace=self.namespace, error=e)
+
+    def _refill(self):
+        """Дополняет очередь до depth: Redis читается без блокировки, next() в это время не ждёт"""
+        cycles = 0
+        while True:
+            with self._lock:
+                need = self.depth - len(self._queue)
+                if need <= 0:
+                    break
+                tail = self._pool[-(SCHEDULE_WINDOW + need):]
+            if not tail:
+                # Пустой каталог или только что начатый цикл целиком из удалённых треков
+                if cycles or not len(self.catalog):
+                    break
+                pool = self._new_cycle()
+                cycles += 1
+                with self._lock:
+                    if not self._pool:
+                        self._pool = pool
+                        self._write_pool(pool)
+                continue
+            # Артисты хвоста, из которого будем выбирать: каждый выбор сдвигает окно на одну позицию
+            self._load_artists(tail)
+            with self._lock:
+                self._fill()
+        with self._lock:
+            self._persist_queue()
+
+    def _new_cycle(self):
+        keys = self.catalog.keys()
+        try:
+            weights = self.redis.hgetall(SCHEDULE_WEIGHTS_KEY)
+        except Exception as e:
+            log_event('schedule_weights_error', namespace=self.namespace, error=e)
+            weights = {}
+
+        pool = []
+        for key in keys:
+            try:
+                weight = int(weights.get(key, 1))
+            except ValueError:
+                weight = 1
+            pool.extend([key] * max(1, min(weight, SCHEDULE_MAX_WEIGHT)))
+        random.shuffle(pool)
+        log_event('schedule_new_cycle', namespace=self.namespace, plays=len(pool), tracks=len(keys))
+        return pool
+
+    def _write_pool(self, pool):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(self.pool_key)
+        for start in range(0, len(pool), SCHEDULE_WRITE_BATCH):
+            pipe.rpush(self.pool_key, *pool[start:start + SCHEDULE_WRITE_BATCH])
+        self._execute(pipe)
+
+    def _fill(self):
+        # Только память: артисты уже прочитаны в _refill, записи уходят в фоновый поток
+        while len(self._queue) < self.depth and self._pool:
+            key = self._take()
+            if key is not None:
+                self._queue.append(key)
+                self._recent.append(key)
+
+    def _take(self):
+        """Снимает с хвоста пула лучший по правилам трек; удалённые из каталога выбрасывает"""
+        window = self._pool[-SCHEDULE_WINDOW:]
+        offset = len(self._pool) - len(window)
+
+        recent = list(self._recent)
+        recent_tracks = set(recent[-SCHEDULE_TRACK_SEPARATION:]) if SCHEDULE_TRACK_SEPARATION else set()
+        recent_artists = {
+            self._artists.get(k) for k in recent[-SCHEDULE_ARTIST_SEPARATION:]
+        } - {None, ''} if SCHEDULE_ARTIST_SEPARATION else set()
+
+        # Сначала оба правила, потом только повторы, потом что есть — правила не должны останавливать эфир
+        choice = None
+        alive = [i for i in range(len(window) - 1, -1, -1) if window[i] in self.catalog]
+        for rules in ((True, True), (True, False), (False, False)):
+            for i in alive:
+                key = window[i]
+                if rules[0] and key in recent_tracks:
+                    continue
+                if rules[1] and self._artists.get(key) in recent_artists:
+                    continue
+                choice = i
+                break
+            if choice is not None:
+                break
+
+        if choice is None:
+            # Весь хвост — удалённые треки: выбрасываем его и пробуем дальше
+            del self._pool[offset:]
+            if offset:
+                self._redis_call(self.redis.ltrim, self.pool_key, 0, offset - 1)
+            else:
+                self._redis_call(self.redis.delete, self.pool_key)
+            return None
+
+        # Выбранный меняется местами с последним и снимается; пул в Redis повторяет это теми же
+        # LSET и RPOP — LSET дешёвый, индекс в пределах окна от хвоста
+        index = offset + choice
+        key = self._pool[index]
+        last = self._pool.pop()
+        pipe = self.redis.pipeline(transaction=False)
+        if index < len(self._pool):
+            self._pool[index] = last
+            pipe.lset(self.pool_key, index - len(self._pool) - 1, last)
+        pipe.rpop(self.pool_key)
+        self._execute(pipe)
+        return key
+
+    def _load_artists(self, keys):
+        missing = [key for key in keys if key not in self._artists]
+        if not missing:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key in missing:
+                pipe.hget(f"track_meta:{key}", "artist")
+            artists = pipe.execute()
+        except Exception as e:
+            log_event('schedule_artist_error', namespace=self.namespace, error=e)
+            artists = [None] * len(missing)
+        for key, artist in zip(missing, artists):
+            self._artists[key] = (artist or '').strip().lower()
+
+    def _persist_queue(self):
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(self.queue_key)
+        if self._queue:
+            pipe.rpush(self.queue_key, *self._queue)
+        self._execute(pipe)
+
+    def _execute(self, pipe):
+        self._redis_call(pipe.execute)
+
+    def _redis_call(self, method, *args):
+        # Вызывается под блокировкой — сама запись идёт в фоновом потоке в порядке изменений
+        self._jobs.put(lambda: self._write(method, *args))
+
+    def _write(self, method, *args):
+        try:
+            method(*args)
+        except Exception as e:
+            # Эфир идёт по очереди в памяти; Redis догонит при следующей записи очереди
+            log_event('schedule_persist_error', namespace=self.namespace, error=e)
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import log_event
+
+
+class TrackCache:
+    """LRU-кэш треков на диске; ключ — ключ объекта в S3 плюс его ETag"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # имя файла -> размер
+        self._size = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        # После рестарта подхватываем то, что уже лежит на диске, старые файлы — первыми на вытеснение
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not os.path.isfile(path):
+                continue
+            if name.endswith('.part'):
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_atime, name, stat.st_size))
+
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._size += size
+        self._evict()
+
+    @staticmethod
+    def _name(key, etag):
+        return hashlib.sha1(f"{key}\0{etag}".encode()).hexdigest()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, key, etag):
+        if not etag:
+            return None
+        name = self._name(key, etag)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        return self._path(name)
+
+    def __contains__(self, item):
+        key, etag = item
+        with self._lock:
+            return bool(etag) and self._name(key, etag) in self._entries
+
+    def tee(self, key, etag, chunks):
+        """Отдаёт куски дальше и параллельно пишет их в кэш; в кэш попадает только целый файл"""
+        if not etag:
+            yield from chunks
+            return
+
+        name = self._name(key, etag)
+        tmp_path = self._path(f"{name}.{threading.get_ident()}.part")
+        size = 0
+        complete = False
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                self._commit(name, tmp_path, size)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def store(self, key, etag, chunks):
+        for _ in self.tee(key, etag, chunks):
+            pass
+        return self.get(key, etag)
+
+    def _commit(self, name, tmp_path, size):
+        with self._lock:
+            os.replace(tmp_path, self._path(name))
+            if name in self._entries:
+                self._size -= self._entries[name]
+            self._entries[name] = size
+            self._size += size
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+
+
+class Prefetcher:
+    """Фоновая докачка следующих треков в кэш, пока играет текущий"""
+
+    def __init__(self, cache, fetch, max_bytes):
+        self.cache = cache
+        self.fetch = fetch
+        self.max_bytes = max_bytes
+        self._queue = []
+        self._active = None
+        self._done = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def schedule(self, items):
+        """items — (ключ, etag, размер) в порядке проигрывания; берём столько, сколько влезает в бюджет"""
+        queue = []
+        budget = self.max_bytes
+        for key, etag, size in items:
+            if (key, etag) in self.cache:
+                continue
+            if size > budget:
+                break
+            budget -= size
+            queue.append((key, etag))
+
+        with self._done:
+            self._queue = queue
+            self._done.notify_all()
+
+    def wait(self, key, etag, timeout=None):
+        """Если трек прямо сейчас докачивается, ждём его, а не тянем второй раз"""
+        with self._done:
+            self._done.wait_for(lambda: self._active != (key, etag), timeout)
+        return self.cache.get(key, etag)
+
+    def _run(self):
+        while True:
+            with self._done:
+                self._done.wait_for(lambda: self._queue)
+                key, etag = self._queue.pop(0)
+                if (key, etag) in self.cache:
+                    continue
+                self._active = (key, etag)
+
+            try:
+                log_event('prefetch', key=key)
+                self.cache.store(key, etag, self.fetch(key))
+            except Exception as e:
+                log_event('prefetch_error', key=key, error=e)
+            finally:
+                with self._done:
+                    self._active = None
+                    self._done.notify_all()